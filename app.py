@@ -1,16 +1,17 @@
 import gradio as gr
 import time
-import os
 import sys
-import importlib
 from core.config import (
     SERVER_PORT, ENABLE_LOGIN, LOGIN_CREDENTIALS, SHARE_GRADIO, 
-    COMFYUI_OUTPUT_PATH, AUTO_DOWNLOAD_MODELS, GRADIO_SERVER_NAME
+    COMFYUI_OUTPUT_PATH, AUTO_DOWNLOAD_MODELS, MODEL_DOWNLOAD_MODE, GRADIO_SERVER_NAME, BACKEND_MONITOR_INTERVAL,
+    ENABLE_NODE_INFO_REFRESH_API
+)
+from core.ui_loader import (
+    discover_ui_modules, load_ui_layout, load_ui_list, get_module_manifest, import_module_timed, print_import_report
 )
-from core.ui_loader import discover_ui_modules, load_ui_layout, load_ui_list
 from core.ui_builder import build_gradio_ui
 
-from core import job_manager, node_info_manager, backend_manager
+from core import job_manager, node_info_manager, backend_manager, input_staging
 
 
 js_shortcut_code = """
@@ -42,30 +43,39 @@ def discover_and_register_mcp_modules(app: gr.Blocks):
     if 'custom' not in sys.path:
         sys.path.insert(0, 'custom')
 
-    ui_dirs_to_scan = ["module", "custom/module"]
-    for ui_dir in ui_dirs_to_scan:
-        if not os.path.isdir(ui_dir):
+    for entry in get_module_manifest():
+        if entry["kind"] != "mcp":
+            continue
+        module_name = entry["module_name"]
+        if not entry["has_mcp_functions"]:
+            print(f"  ⚠️  Skipping MCP module (no MCP_FUNCTIONS list): {module_name}")
             continue
-        for root, _, files in os.walk(ui_dir):
-            for filename in files:
-                if filename.endswith("_mcp.py"):
-                    module_path_parts = os.path.normpath(os.path.join(root, filename[:-3])).split(os.sep)
-                    module_name = ".".join(module_path_parts)
-                    try:
-                        module = importlib.import_module(module_name)
-                        if hasattr(module, 'MCP_FUNCTIONS') and isinstance(module.MCP_FUNCTIONS, list):
-                            for func in module.MCP_FUNCTIONS:
-                                gr.api(func)
-                                print(f"  ✅ Registered MCP tool: '{func.__name__}' from {module_name}")
-                        else:
-                            print(f"  ⚠️  Skipping MCP module (no MCP_FUNCTIONS list): {module_name}")
-                    except Exception as e:
-                        import traceback
-                        traceback.print_exc()
-                        print(f"  ❌ Error loading MCP module {module_name}: {e}")
+        try:
+            module = import_module_timed(module_name)
+            if hasattr(module, 'MCP_FUNCTIONS') and isinstance(module.MCP_FUNCTIONS, list):
+                for func in module.MCP_FUNCTIONS:
+                    gr.api(func)
+                    print(f"  ✅ Registered MCP tool: '{func.__name__}' from {module_name}")
+            else:
+                print(f"  ⚠️  Skipping MCP module (no MCP_FUNCTIONS list): {module_name}")
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"  ❌ Error loading MCP module {module_name}: {e}")
     print("MCP module registration finished.")
     print("="*50)
 
+def refresh_backend_node_info(backend_name: str = "") -> dict:
+    """
+    Reloads the node definitions of a ComfyUI backend without restarting the web UI, e.g. after installing custom nodes.
+    Leave backend_name empty to refresh every backend. Returns the number of changed node classes per backend (null if unreachable).
+    """
+    return node_info_manager.refresh_node_info(backend_name or None)
+
+def _on_backend_reconnect(backend_name):
+    input_staging.forget_backend_uploads(backend_name)
+    node_info_manager.refresh_node_info(backend_name, retries=3)
+
 def main():
     print("="*50)
     print("Initializing Backend Manager...")
@@ -100,12 +110,24 @@ def main():
     if not node_info_initialized:
         return
 
+    backend_manager.backend_manager.register_reconnect_listener(_on_backend_reconnect)
+    backend_manager.backend_manager.start_monitor(BACKEND_MONITOR_INTERVAL)
+
     if AUTO_DOWNLOAD_MODELS:
         try:
             print("="*50)
             print("Starting model check and download process...")
-            from core.model_downloader import check_and_download_models
-            check_and_download_models()
+            from core.model_downloader import (
+                check_and_download_models, ensure_models_for_module, start_background_model_downloads
+            )
+            if MODEL_DOWNLOAD_MODE == "startup":
+                check_and_download_models()
+            else:
+                check_and_download_models(global_only=True)
+                job_manager.register_job_preparer(ensure_models_for_module)
+                if MODEL_DOWNLOAD_MODE == "background":
+                    start_background_model_downloads()
+                print(f"Module models will be downloaded {'in the background' if MODEL_DOWNLOAD_MODE == 'background' else 'on first use'}.")
             print("Model check and download process finished.")
             print("="*50)
         except Exception as e:
@@ -139,6 +161,12 @@ def main():
                 print(f"  - Error binding events for {module.__name__}: {e}")
         
         discover_and_register_mcp_modules(demo)
+        if ENABLE_NODE_INFO_REFRESH_API:
+            if not ENABLE_LOGIN:
+                print("[Config] Warning: enable_node_info_refresh_api is on without enable_login; anyone who can reach the UI can trigger node info reloads.")
+            gr.api(refresh_backend_node_info, show_api=False, concurrency_limit=1)
+
+    print_import_report()
     
     auth_credentials = None
     if ENABLE_LOGIN and LOGIN_CREDENTIALS:
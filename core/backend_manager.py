@@ -1,7 +1,9 @@
+import hashlib
 import requests
 import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
-from core.config import COMFYUI_BACKENDS
+from core.config import COMFYUI_BACKENDS, BACKEND_NODE_INFO_CHECK_INTERVAL
 
 class BackendManager:
     _instance = None
@@ -20,6 +22,8 @@ class BackendManager:
             
         self.backends = COMFYUI_BACKENDS
         self.active_backend_name = "default"
+        self._reconnect_listeners = []
+        self._monitor_thread = None
         self._initialized = True
         print(f"[BackendManager] Initialized with default backend '{self.active_backend_name}'.")
 
@@ -67,4 +71,82 @@ class BackendManager:
         self.active_backend_name = target_backend_name
         print(f"[BackendManager] Switch complete. Active backend is now '{self.active_backend_name}'.")
 
+    def register_reconnect_listener(self, listener):
+        """
+        listener(backend_name) is called from the monitor thread when a backend comes back online, changes
+        version, or reports different /object_info than at the previous fingerprint check.
+        """
+        self._reconnect_listeners.append(listener)
+
+    def _probe_backend(self, backend_url):
+        try:
+            response = requests.get(f"{backend_url}/system_stats", timeout=5)
+            response.raise_for_status()
+            return response.json().get("system", {})
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+
+    def _fingerprint_object_info(self, backend_url):
+        try:
+            response = requests.get(f"{backend_url}/object_info", timeout=20)
+            response.raise_for_status()
+            return hashlib.sha256(response.content).hexdigest()
+        except requests.exceptions.RequestException:
+            return None
+
+    def _notify_reconnect(self, backend_name):
+        for listener in self._reconnect_listeners:
+            try:
+                listener(backend_name)
+            except Exception as e:
+                print(f"[BackendManager] Warning: Reconnect listener failed for '{backend_name}': {e}")
+
+    def _monitor_backends(self, interval):
+        # A restart that finishes between two health checks looks like an unchanged backend, so the
+        # /object_info fingerprint is also compared every BACKEND_NODE_INFO_CHECK_INTERVAL seconds.
+        last_seen = {name: self._probe_backend(url) for name, url in self.backends.items()}
+        fingerprints = {}
+        fingerprint_checked_at = {}
+        while True:
+            time.sleep(interval)
+            for name, url in self.backends.items():
+                system = self._probe_backend(url)
+                previous = last_seen.get(name)
+                last_seen[name] = system
+                if system is None:
+                    if previous is not None:
+                        print(f"[BackendManager] Backend '{name}' went offline. Waiting for it to come back...")
+                    continue
+
+                reconnected = False
+                if previous is None:
+                    print(f"[BackendManager] Backend '{name}' is back online.")
+                    reconnected = True
+                elif previous.get("comfyui_version") != system.get("comfyui_version"):
+                    print(f"[BackendManager] Backend '{name}' changed version ({previous.get('comfyui_version')} -> {system.get('comfyui_version')}).")
+                    reconnected = True
+
+                if BACKEND_NODE_INFO_CHECK_INTERVAL > 0 and (
+                    reconnected or time.monotonic() - fingerprint_checked_at.get(name, 0) >= BACKEND_NODE_INFO_CHECK_INTERVAL
+                ):
+                    fingerprint = self._fingerprint_object_info(url)
+                    fingerprint_checked_at[name] = time.monotonic()
+                    if fingerprint and fingerprints.get(name) not in (None, fingerprint) and not reconnected:
+                        print(f"[BackendManager] Backend '{name}' reports different node definitions.")
+                        reconnected = True
+                    if fingerprint:
+                        fingerprints[name] = fingerprint
+
+                if reconnected:
+                    self._notify_reconnect(name)
+
+    def start_monitor(self, interval):
+        if interval <= 0 or self._monitor_thread is not None:
+            return
+        self._monitor_thread = threading.Thread(
+            target=self._monitor_backends, args=(interval,), name="backend_monitor", daemon=True
+        )
+        self._monitor_thread.start()
+        print(f"[BackendManager] Monitoring {len(self.backends)} backend(s) for restarts every {interval}s.")
+
 backend_manager = BackendManager()
\ No newline at end of file
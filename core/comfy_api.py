@@ -9,38 +9,60 @@ from pathlib import Path
 import gradio as gr
 import pyperclip
 import os
+import gzip
+from concurrent.futures import ThreadPoolExecutor
 
 from core.backend_manager import backend_manager
-from core.config import DEV_COPY_WORKFLOW_TO_CLIPBOARD, DEV_SAVE_WORKFLOW_TO_JSON, JSON_SAVE_PATH
+from core import node_info_manager
+from core.config import (
+    DEV_COPY_WORKFLOW_TO_CLIPBOARD, DEV_SAVE_WORKFLOW_TO_JSON, DEV_COMPRESS_WORKFLOW_JSON, JSON_SAVE_PATH
+)
 from core.workflow_utils import get_filename_prefix
 
+_dev_dump_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workflow_dump")
+
+def _encode_json(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+def _save_workflow_dump(workflow_str, filepath):
+    try:
+        if DEV_COMPRESS_WORKFLOW_JSON:
+            filepath += ".gz"
+            with gzip.open(filepath, 'wt', encoding='utf-8', compresslevel=6) as f:
+                f.write(workflow_str)
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(workflow_str)
+        print(f"[Dev Feature] Workflow saved to: {filepath}")
+    except Exception as e:
+        print(f"[Dev Feature] Warning: Failed to save workflow to JSON file: {e}")
+
 def queue_prompt(prompt_workflow, client_id, extra_data=None):
     try:
+        workflow_str = _encode_json(prompt_workflow)
+
         if DEV_COPY_WORKFLOW_TO_CLIPBOARD:
             try:
-                workflow_str = json.dumps(prompt_workflow, indent=2)
                 pyperclip.copy(workflow_str)
                 print("[Dev Feature] Workflow JSON has been copied to the clipboard.")
             except Exception as e:
                 print(f"[Dev Feature] Warning: Failed to copy workflow to clipboard: {e}")
         
         if DEV_SAVE_WORKFLOW_TO_JSON:
-            try:
-                filename = f"{get_filename_prefix()}_workflow.json"
-                filepath = os.path.join(JSON_SAVE_PATH, filename)
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(prompt_workflow, f, indent=2)
-                print(f"[Dev Feature] Workflow saved to: {filepath}")
-            except Exception as e:
-                print(f"[Dev Feature] Warning: Failed to save workflow to JSON file: {e}")
-
+            filepath = os.path.join(JSON_SAVE_PATH, f"{get_filename_prefix()}_workflow.json")
+            _dev_dump_executor.submit(_save_workflow_dump, workflow_str, filepath)
 
-        payload = {"prompt": prompt_workflow, "client_id": client_id}
+        payload_rest = {"client_id": client_id}
         if extra_data:
-            payload.update(extra_data)
+            payload_rest.update({k: v for k, v in extra_data.items() if k != "prompt"})
+        body = '{"prompt":' + workflow_str + ',' + _encode_json(payload_rest)[1:]
         
         active_url = backend_manager.get_active_backend_url()
-        response = requests.post(f"{active_url}/prompt", json=payload)
+        response = requests.post(
+            f"{active_url}/prompt",
+            data=body.encode('utf-8'),
+            headers={"Content-Type": "application/json"}
+        )
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -119,6 +141,15 @@ def run_workflow_and_get_output(workflow_data):
     else:
         prompt_workflow = workflow_data
 
+    missing_nodes = node_info_manager.get_missing_node_types(prompt_workflow, backend_manager.active_backend_name)
+    if missing_nodes:
+        details = []
+        for class_type in missing_nodes:
+            capable_backends = node_info_manager.get_backends_for_node(class_type)
+            details.append(f"{class_type} (available on: {', '.join(sorted(capable_backends))})" if capable_backends else class_type)
+        yield f"Error: Backend '{backend_manager.active_backend_name}' is missing node(s) required by this workflow: {'; '.join(details)}", None
+        return
+
     yield "Status: Sending to ComfyUI...", None
     
     queue_data = queue_prompt(prompt_workflow, client_id, extra_data)
@@ -27,6 +27,10 @@ def load_config():
 config = load_config()
 
 WAIT_FOR_ALL_BACKENDS = config.get("wait_for_all_backends", True)
+BACKEND_MONITOR_INTERVAL = float(config.get("backend_monitor_interval", 15) or 0)
+BACKEND_NODE_INFO_CHECK_INTERVAL = float(config.get("backend_node_info_check_interval", 300) or 0)
+ENABLE_NODE_INFO_REFRESH_API = config.get("enable_node_info_refresh_api", False)
+LAZY_UI_TABS = config.get("lazy_ui_tabs", False)
 
 env_backends = _load_backends_from_env()
 if env_backends:
@@ -36,6 +40,12 @@ else:
     COMFYUI_BACKENDS = config.get("comfyui_backends", {})
     print("[Config] Loaded ComfyUI backends from YAML configuration file.")
 
+env_remote_backends = os.getenv("COMFYUI_REMOTE_BACKENDS")
+if env_remote_backends is not None:
+    COMFYUI_REMOTE_BACKENDS = [name.strip().lower() for name in env_remote_backends.split(",") if name.strip()]
+else:
+    COMFYUI_REMOTE_BACKENDS = config.get("comfyui_remote_backends", []) or []
+
 if not isinstance(COMFYUI_BACKENDS, dict) or "default" not in COMFYUI_BACKENDS:
     raise ValueError(
         "Error: 'comfyui_backends' configuration is missing in the config file or environment variables, or the 'default' backend is not defined.\n"
@@ -54,6 +64,7 @@ if not COMFYUI_PATH or not os.path.isdir(COMFYUI_PATH):
 
 DEV_COPY_WORKFLOW_TO_CLIPBOARD = config.get("developer_copy_workflow_to_clipboard", False)
 DEV_SAVE_WORKFLOW_TO_JSON = config.get("developer_save_workflow_to_json", True)
+DEV_COMPRESS_WORKFLOW_JSON = config.get("developer_compress_workflow_json", False)
 
 
 HTTP_PROXY = os.getenv("HTTP_PROXY", config.get("http_proxy", None))
@@ -100,7 +111,22 @@ if ENABLE_LOGIN:
                 "You must set a non-empty username and password for each user."
             )
 
+USER_MODEL_CACHE_MAX_SIZE_GB = float(config.get("user_model_cache_max_size_gb", 0) or 0)
+
 AUTO_DOWNLOAD_MODELS = config.get("auto_download_models", True)
+VERIFY_MODEL_CHECKSUMS = config.get("verify_model_checksums", "warn")
+VERIFY_MODEL_CHECKSUMS = {True: "warn", False: "off", None: "off"}.get(VERIFY_MODEL_CHECKSUMS, str(VERIFY_MODEL_CHECKSUMS).lower())
+if VERIFY_MODEL_CHECKSUMS not in ("off", "warn", "replace"):
+    print(f"[Config] Warning: Unknown verify_model_checksums '{VERIFY_MODEL_CHECKSUMS}'. Falling back to 'warn'.")
+    VERIFY_MODEL_CHECKSUMS = "warn"
+MODEL_DOWNLOAD_MODE = str(config.get("model_download_mode", "startup")).lower()
+if MODEL_DOWNLOAD_MODE not in ("startup", "background", "on_demand"):
+    print(f"[Config] Warning: Unknown model_download_mode '{MODEL_DOWNLOAD_MODE}'. Falling back to 'startup'.")
+    MODEL_DOWNLOAD_MODE = "startup"
+DOWNLOAD_CONNECTIONS = max(int(config.get("download_connections", 16)), 1)
+DOWNLOAD_BANDWIDTH_LIMIT_MB = float(config.get("download_bandwidth_limit_mb_per_s", 0) or 0)
+MODEL_DOWNLOAD_WORKERS = max(int(config.get("model_download_workers", 4)), 1)
+MODEL_DOWNLOAD_CONNECTIONS_PER_HOST = max(int(config.get("model_download_connections_per_host", 32)), 1)
 
 HF_CACHE_PATH = os.getenv("HF_CACHE_PATH", config.get("hf_cache_path", None))
 
@@ -109,19 +135,37 @@ COMFYUI_OUTPUT_PATH = os.path.join(COMFYUI_PATH, "output")
 LORA_DIR = os.path.join(COMFYUI_PATH, "models", "loras")
 EMBEDDING_DIR = os.path.join(COMFYUI_PATH, "models", "embeddings")
 JSON_SAVE_PATH = os.path.join(COMFYUI_PATH, "JSON")
+CACHE_PATH = os.getenv("WEBUI_CACHE_PATH", config.get("cache_path") or os.path.join(COMFYUI_PATH, "webui_cache"))
+
+INPUT_CACHE_MAX_SIZE_MB = int(config.get("input_cache_max_size_mb", 2048))
+
+TEMP_IMAGE_FORMAT = str(config.get("temp_image_format", "png")).lower()
+if TEMP_IMAGE_FORMAT not in ("png", "tiff"):
+    print(f"[Config] Warning: Unsupported temp_image_format '{TEMP_IMAGE_FORMAT}'. Falling back to 'png'.")
+    TEMP_IMAGE_FORMAT = "png"
+TEMP_IMAGE_COMPRESS_LEVEL = min(max(int(config.get("temp_image_compress_level", 1)), 0), 9)
+INPUT_ENCODE_WORKERS = max(int(config.get("input_encode_workers", min(4, os.cpu_count() or 1))), 1)
 
 print("="*50)
 print("Configuration Loaded:")
 print(f"  Startup Policy: {'Wait for all backends' if WAIT_FOR_ALL_BACKENDS else 'Start with at least one backend'}")
+print(f"  Backend Reconnect Monitor: {f'every {BACKEND_MONITOR_INTERVAL}s' if BACKEND_MONITOR_INTERVAL > 0 else 'Disabled'}")
+print(f"  Backend Node Info Check: {f'every {BACKEND_NODE_INFO_CHECK_INTERVAL}s' if BACKEND_MONITOR_INTERVAL > 0 and BACKEND_NODE_INFO_CHECK_INTERVAL > 0 else 'Disabled'}")
+print(f"  Node Info Refresh API: {ENABLE_NODE_INFO_REFRESH_API}")
 print(f"  ComfyUI Path: {COMFYUI_PATH}")
 print("  ComfyUI Backends:")
 for name, url in COMFYUI_BACKENDS.items():
-    print(f"    - {name}: {url}")
+    print(f"    - {name}: {url}{' (remote, inputs uploaded via API)' if name in COMFYUI_REMOTE_BACKENDS else ''}")
 print(f"  Input Directory: {COMFYUI_INPUT_PATH}")
+print(f"  Temp Image Encoding: {TEMP_IMAGE_FORMAT}{f' (compress_level={TEMP_IMAGE_COMPRESS_LEVEL})' if TEMP_IMAGE_FORMAT == 'png' else ' (uncompressed)'}, {INPUT_ENCODE_WORKERS} worker(s)")
+print(f"  Input Cache Size Limit: {f'{INPUT_CACHE_MAX_SIZE_MB} MB' if INPUT_CACHE_MAX_SIZE_MB > 0 else 'Unlimited'}")
 print(f"  Output Directory: {COMFYUI_OUTPUT_PATH}")
 print(f"  LoRA Directory: {LORA_DIR}")
 print(f"  Embedding Directory: {EMBEDDING_DIR}")
+print(f"  Civitai/URL LoRA & Embedding Budget: {f'{USER_MODEL_CACHE_MAX_SIZE_GB} GB' if USER_MODEL_CACHE_MAX_SIZE_GB > 0 else 'Unlimited'}")
 print(f"  JSON Save Directory: {JSON_SAVE_PATH}")
+print(f"  Cache Directory: {CACHE_PATH}")
+print(f"  Lazy UI Tabs: {LAZY_UI_TABS}")
 print(f"  Server Port: {SERVER_PORT}")
 print(f"  Server Name: {GRADIO_SERVER_NAME}")
 print(f"  Share Gradio: {SHARE_GRADIO}")
@@ -130,7 +174,12 @@ if ENABLE_LOGIN:
     print(f"  Login Users Found: {len(LOGIN_CREDENTIALS)}")
 print(f"  Dev: Copy Workflow to Clipboard: {DEV_COPY_WORKFLOW_TO_CLIPBOARD}")
 print(f"  Dev: Save Workflow to JSON: {DEV_SAVE_WORKFLOW_TO_JSON}")
-print(f"  Auto Download Models: {AUTO_DOWNLOAD_MODELS}")
+print(f"  Dev: Compress Saved Workflow JSON: {DEV_COMPRESS_WORKFLOW_JSON}")
+print(f"  Auto Download Models: {AUTO_DOWNLOAD_MODELS}{f' (mode: {MODEL_DOWNLOAD_MODE})' if AUTO_DOWNLOAD_MODELS else ''}")
+print(f"  Verify Model Checksums: {VERIFY_MODEL_CHECKSUMS}")
+print(f"  Download Connections per File: {DOWNLOAD_CONNECTIONS}")
+print(f"  Model Download Concurrency: {MODEL_DOWNLOAD_WORKERS} file(s), {MODEL_DOWNLOAD_CONNECTIONS_PER_HOST} connection(s) per host")
+print(f"  Download Bandwidth Limit: {f'{DOWNLOAD_BANDWIDTH_LIMIT_MB} MB/s' if DOWNLOAD_BANDWIDTH_LIMIT_MB > 0 else 'Unlimited'}")
 print(f"  HTTP Proxy: {HTTP_PROXY if HTTP_PROXY else 'Not set'}")
 print(f"  HTTPS Proxy: {HTTPS_PROXY if HTTPS_PROXY else 'Not set'}")
 if proxy_set_message:
@@ -144,4 +193,5 @@ print("="*50)
 os.makedirs(COMFYUI_INPUT_PATH, exist_ok=True)
 os.makedirs(LORA_DIR, exist_ok=True)
 os.makedirs(EMBEDDING_DIR, exist_ok=True)
-os.makedirs(JSON_SAVE_PATH, exist_ok=True)
\ No newline at end of file
+os.makedirs(JSON_SAVE_PATH, exist_ok=True)
+os.makedirs(CACHE_PATH, exist_ok=True)
\ No newline at end of file
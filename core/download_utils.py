@@ -1,12 +1,37 @@
 import os
 import requests
+import urllib3
 import hashlib
+import json
+import time
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 import gradio as gr
-from core.config import LORA_DIR, EMBEDDING_DIR, HTTP_PROXY, HTTPS_PROXY
+from core.config import (
+    LORA_DIR, EMBEDDING_DIR, HTTP_PROXY, HTTPS_PROXY, DOWNLOAD_CONNECTIONS, DOWNLOAD_BANDWIDTH_LIMIT_MB,
+    CACHE_PATH
+)
+from core import model_catalog
 
 os.makedirs(LORA_DIR, exist_ok=True)
 os.makedirs(EMBEDDING_DIR, exist_ok=True)
 
+CIVITAI_CACHE_PATH = os.path.join(CACHE_PATH, "civitai_metadata.json")
+CIVITAI_CACHE_TTL = 7 * 24 * 60 * 60
+CIVITAI_NEGATIVE_CACHE_TTL = 60 * 60
+
+DOWNLOAD_MAX_RETRIES = 5
+SEGMENT_MIN_SIZE = 8 * 1024 * 1024
+STREAM_BUFFER_SIZE = 4 * 1024 * 1024
+PROGRESS_REPORT_INTERVAL = 0.5
+
+_civitai_cache = None
+_civitai_cache_lock = threading.Lock()
+
+_inflight_downloads = {}
+_inflight_lock = threading.Lock()
+
 def _get_proxies():
     proxies = {}
     if HTTP_PROXY:
@@ -15,51 +40,412 @@ def _get_proxies():
         proxies['https'] = HTTPS_PROXY
     return proxies if proxies else None
 
-def get_civitai_file_info(version_id):
+def _load_civitai_cache():
+    global _civitai_cache
+    if _civitai_cache is None:
+        try:
+            with open(CIVITAI_CACHE_PATH, 'r', encoding='utf-8') as f:
+                _civitai_cache = json.load(f)
+        except (OSError, ValueError):
+            _civitai_cache = {}
+    return _civitai_cache
+
+def _save_civitai_cache():
+    tmp_path = f"{CIVITAI_CACHE_PATH}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(_civitai_cache, f)
+        os.replace(tmp_path, CIVITAI_CACHE_PATH)
+    except OSError as e:
+        print(f"Warning: Could not save Civitai metadata cache: {e}")
+
+def _fetch_civitai_file_info(version_id):
     api_url = f"https://civitai.com/api/v1/model-versions/{version_id}"
+    response = requests.get(api_url, timeout=10, proxies=_get_proxies())
+    response.raise_for_status()
+    data = response.json()
+    
+    for file_data in data.get('files', []):
+        if file_data.get('type') == 'Model' and file_data['name'].endswith(('.safetensors', '.pt')):
+            return file_data
+    
+    if data.get('files'):
+        return data['files'][0]
+    return None
+
+def get_civitai_file_info(version_id):
+    version_id = str(version_id).strip()
+    with _civitai_cache_lock:
+        entry = _load_civitai_cache().get(version_id)
+    if entry:
+        ttl = CIVITAI_CACHE_TTL if entry.get('file') else CIVITAI_NEGATIVE_CACHE_TTL
+        if time.time() - entry.get('fetched_at', 0) < ttl:
+            return entry.get('file')
+
     try:
-        response = requests.get(api_url, timeout=10, proxies=_get_proxies())
-        response.raise_for_status()
-        data = response.json()
-        
-        for file_data in data.get('files', []):
-            if file_data.get('type') == 'Model' and file_data['name'].endswith(('.safetensors', '.pt')):
-                return file_data
-        
-        if data.get('files'):
-            return data['files'][0]
-            
+        file_info = _fetch_civitai_file_info(version_id)
     except Exception as e:
         print(f"Error getting Civitai info for version {version_id}: {e}")
+        status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+        if status_code not in (401, 403, 404):
+            return entry.get('file') if entry else None
+        file_info = None
+
+    with _civitai_cache_lock:
+        _load_civitai_cache()[version_id] = {'fetched_at': time.time(), 'file': file_info}
+        _save_civitai_cache()
+    return file_info
+
+def _load_part_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
         return None
 
-def download_file(url, save_path, api_key=None, progress=None, desc=""):
-    if os.path.exists(save_path):
-        return f"File already exists: {os.path.basename(save_path)}"
-    
+def _save_part_meta(meta_path, meta):
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+def _discard_partial(part_path, meta_path):
+    for path in (part_path, meta_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+def _parse_content_range_total(response):
+    content_range = response.headers.get('Content-Range', '')
+    if '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        if total.isdigit():
+            return int(total)
+    return 0
+
+class _BandwidthLimiter:
+    """Token bucket shared by every download stream in the process."""
+    def __init__(self, bytes_per_second):
+        self.rate = bytes_per_second
+        self.allowance = bytes_per_second
+        self.last_check = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, num_bytes):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.last_check) * self.rate)
+            self.last_check = now
+            self.allowance -= num_bytes
+            wait = -self.allowance / self.rate if self.allowance < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+_bandwidth_limiter = _BandwidthLimiter(DOWNLOAD_BANDWIDTH_LIMIT_MB * 1024 * 1024)
+
+class _ProgressThrottle:
+    def __init__(self, callback, interval=PROGRESS_REPORT_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.last_report = 0.0
+
+    def __call__(self, downloaded, total, force=False):
+        if not self.callback:
+            return
+        now = time.monotonic()
+        if force or (total and downloaded >= total) or now - self.last_report >= self.interval:
+            self.last_report = now
+            self.callback(downloaded, total)
+
+def _iter_response_buffers(response, max_bytes=None):
+    """
+    Yields views over one reusable STREAM_BUFFER_SIZE buffer filled with readinto.
+    Each view is only valid until the next iteration, so callers must write it out first.
+    Errors from the raw urllib3 stream are re-raised as the requests exceptions that
+    iter_content would raise, so the callers' retry handlers see dropped connections.
+    """
+    encoding = response.headers.get('Content-Encoding', 'identity').lower()
+    if encoding not in ('', 'identity'):
+        for chunk in response.iter_content(chunk_size=STREAM_BUFFER_SIZE):
+            _bandwidth_limiter.consume(len(chunk))
+            yield memoryview(chunk)
+        return
+
+    buffer = bytearray(STREAM_BUFFER_SIZE)
+    view = memoryview(buffer)
+    received = 0
+    while max_bytes is None or received < max_bytes:
+        want = STREAM_BUFFER_SIZE if max_bytes is None else min(STREAM_BUFFER_SIZE, max_bytes - received)
+        try:
+            n = response.raw.readinto(view[:want])
+        except urllib3.exceptions.ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except urllib3.exceptions.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e)
+        if not n:
+            break
+        received += n
+        _bandwidth_limiter.consume(n)
+        yield view[:n]
+
+def fetch_with_resume(url, save_path, headers=None, progress_callback=None, max_retries=DOWNLOAD_MAX_RETRIES, timeout=20):
+    """
+    Streams url into save_path through a persistent .part file.
+    Interrupted transfers continue with a Range request guarded by If-Range, and are
+    retried with exponential backoff. progress_callback receives (downloaded, total).
+    """
+    part_path = f"{save_path}.part"
+    meta_path = f"{part_path}.json"
+    base_headers = dict(headers or {})
+    base_headers['Accept-Encoding'] = 'identity'
+    report_progress = _ProgressThrottle(progress_callback)
+    attempt = 0
+
+    while True:
+        meta = _load_part_meta(meta_path)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset and (not meta or meta.get('segments')):
+            _discard_partial(part_path, meta_path)
+            offset = 0
+
+        request_headers = dict(base_headers)
+        if offset:
+            request_headers['Range'] = f"bytes={offset}-"
+            etag = meta.get('etag')
+            validator = etag if etag and not etag.startswith('W/') else meta.get('last_modified')
+            if validator:
+                request_headers['If-Range'] = validator
+
+        try:
+            with requests.get(url, stream=True, headers=request_headers, timeout=timeout, proxies=_get_proxies()) as r:
+                if r.status_code == 416 and offset:
+                    if meta.get('total') and offset == meta['total']:
+                        break
+                    _discard_partial(part_path, meta_path)
+                    continue
+                r.raise_for_status()
+
+                if offset and r.status_code == 206:
+                    total = _parse_content_range_total(r) or meta.get('total', 0)
+                    if meta.get('total') and total != meta['total']:
+                        _discard_partial(part_path, meta_path)
+                        continue
+                    mode = 'ab'
+                else:
+                    if offset:
+                        print(f"[Download] Remote file changed or range unsupported, restarting {os.path.basename(save_path)}.")
+                    offset = 0
+                    total = int(r.headers.get('content-length', 0))
+                    meta = {
+                        'etag': r.headers.get('ETag'),
+                        'last_modified': r.headers.get('Last-Modified'),
+                        'total': total
+                    }
+                    _save_part_meta(meta_path, meta)
+                    mode = 'wb'
+
+                downloaded = offset
+                report_progress(downloaded, total, force=True)
+                with open(part_path, mode) as f:
+                    for chunk in _iter_response_buffers(r):
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        report_progress(downloaded, total)
+
+            size = os.path.getsize(part_path)
+            if total and size != total:
+                raise IOError(f"Incomplete download: received {size} of {total} bytes.")
+            break
+        except (requests.exceptions.RequestException, IOError) as e:
+            status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+            if status_code and 400 <= status_code < 500 and status_code not in (408, 429):
+                raise
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            delay = min(2 ** attempt, 60)
+            print(f"[Download] {os.path.basename(save_path)}: {e}. Retrying in {delay}s ({attempt}/{max_retries})...")
+            time.sleep(delay)
+
+    os.replace(part_path, save_path)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+def _plan_segments(start, end, connections):
+    remaining = end - start
+    if remaining <= 0:
+        return []
+    count = max(1, min(connections, remaining // SEGMENT_MIN_SIZE))
+    step = -(-remaining // count)
+    return [[pos, min(pos + step, end), 0] for pos in range(start, end, step)]
+
+def fetch_segmented(url, save_path, headers=None, progress_callback=None, connections=DOWNLOAD_CONNECTIONS, timeout=20):
+    """
+    Downloads url over several parallel Range requests into a preallocated .part file.
+    Per-segment progress is recorded in the .part.json sidecar so interrupted downloads
+    resume where each segment stopped. Falls back to fetch_with_resume when the server
+    does not support ranges or the file is too small to split.
+    """
+    part_path = f"{save_path}.part"
+    meta_path = f"{part_path}.json"
+    base_headers = dict(headers or {})
+    base_headers['Accept-Encoding'] = 'identity'
+
+    try:
+        with requests.get(url, stream=True, headers={**base_headers, 'Range': 'bytes=0-0'}, timeout=timeout, proxies=_get_proxies()) as probe:
+            probe.raise_for_status()
+            total = _parse_content_range_total(probe) if probe.status_code == 206 else 0
+            final_url = probe.url
+            etag = probe.headers.get('ETag')
+            last_modified = probe.headers.get('Last-Modified')
+    except requests.exceptions.RequestException:
+        total = 0
+
+    if connections <= 1 or total < SEGMENT_MIN_SIZE * 2:
+        return fetch_with_resume(url, save_path, headers=headers, progress_callback=progress_callback, timeout=timeout)
+
+    if urllib.parse.urlparse(final_url).netloc != urllib.parse.urlparse(url).netloc:
+        base_headers.pop('Authorization', None)
+    validator = etag if etag and not etag.startswith('W/') else last_modified
+    if validator:
+        base_headers['If-Range'] = validator
+
+    meta = _load_part_meta(meta_path) if os.path.exists(part_path) else None
+    same_remote = meta and meta.get('total') == total and meta.get('etag') == etag and meta.get('last_modified') == last_modified
+    if same_remote and meta.get('segments'):
+        segments = meta['segments']
+    elif same_remote:
+        resumed = min(os.path.getsize(part_path), total)
+        segments = [[0, resumed, resumed]] + _plan_segments(resumed, total, connections)
+    else:
+        _discard_partial(part_path, meta_path)
+        segments = _plan_segments(0, total, connections)
+    meta = {'etag': etag, 'last_modified': last_modified, 'total': total, 'segments': segments}
+
+    with open(part_path, 'ab') as f:
+        f.truncate(total)
+    _save_part_meta(meta_path, meta)
+
+    state_lock = threading.Lock()
+    progress_state = {'downloaded': sum(seg[2] for seg in segments), 'last_meta_save': time.time()}
+    report_progress = _ProgressThrottle(progress_callback)
+    report_progress(progress_state['downloaded'], total, force=True)
+    fd = os.open(part_path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+
+    def write_at(offset, data):
+        if hasattr(os, 'pwrite'):
+            os.pwrite(fd, data, offset)
+        else:
+            with open(part_path, 'r+b') as f:
+                f.seek(offset)
+                f.write(data)
+
+    def fetch_segment(segment):
+        attempt = 0
+        while segment[0] + segment[2] < segment[1]:
+            position = segment[0] + segment[2]
+            range_headers = {**base_headers, 'Range': f"bytes={position}-{segment[1] - 1}"}
+            received_before = segment[2]
+            try:
+                with requests.get(final_url, stream=True, headers=range_headers, timeout=timeout, proxies=_get_proxies()) as r:
+                    r.raise_for_status()
+                    if r.status_code != 206:
+                        raise ValueError("Server ignored the range request; the remote file may have changed.")
+                    for chunk in _iter_response_buffers(r, max_bytes=segment[1] - position):
+                        write_at(segment[0] + segment[2], chunk)
+                        with state_lock:
+                            segment[2] += len(chunk)
+                            progress_state['downloaded'] += len(chunk)
+                            report_progress(progress_state['downloaded'], total)
+                            if time.time() - progress_state['last_meta_save'] > 2:
+                                progress_state['last_meta_save'] = time.time()
+                                _save_part_meta(meta_path, meta)
+            except requests.exceptions.RequestException as e:
+                status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+                if status_code and 400 <= status_code < 500 and status_code not in (408, 429):
+                    raise
+                attempt += 1
+                if attempt > DOWNLOAD_MAX_RETRIES:
+                    raise
+                time.sleep(min(2 ** attempt, 60))
+                continue
+            if segment[2] == received_before:
+                attempt += 1
+                if attempt > DOWNLOAD_MAX_RETRIES:
+                    raise IOError(f"Segment at byte {position} stopped receiving data.")
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+            for future in [executor.submit(fetch_segment, seg) for seg in segments if seg[0] + seg[2] < seg[1]]:
+                future.result()
+    finally:
+        os.close(fd)
+        with state_lock:
+            _save_part_meta(meta_path, meta)
+
+    if sum(seg[2] for seg in segments) != total:
+        raise IOError(f"Incomplete download: received {sum(seg[2] for seg in segments)} of {total} bytes.")
+    os.replace(part_path, save_path)
+    os.remove(meta_path)
+
+def _download_to_path(url, save_path, api_key=None, progress=None, desc=""):
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     
     headers = {'Authorization': f'Bearer {api_key}'} if api_key and api_key.strip() else {}
     try:
         if progress: progress(0, desc=desc)
-        response = requests.get(url, stream=True, headers=headers, timeout=15, proxies=_get_proxies())
-        response.raise_for_status()
-        total_size = int(response.headers.get('content-length', 0))
-        
-        with open(save_path, "wb") as f:
-            downloaded = 0
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                if progress and total_size > 0:
-                    downloaded += len(chunk)
-                    progress(downloaded / total_size, desc=desc)
-                    
+
+        def on_progress(downloaded, total):
+            if progress and total > 0:
+                progress(downloaded / total, desc=desc)
+
+        fetch_segmented(url, save_path, headers=headers, progress_callback=on_progress, timeout=15)
+        model_catalog.invalidate(save_path)
         return f"Successfully downloaded: {os.path.basename(save_path)}"
     except Exception as e:
-        if os.path.exists(save_path):
-            os.remove(save_path)
         return f"Download failed for {os.path.basename(save_path)}: {e}"
 
+def download_file(url, save_path, api_key=None, progress=None, desc=""):
+    if os.path.exists(save_path):
+        return f"File already exists: {os.path.basename(save_path)}"
+
+    key = os.path.abspath(save_path)
+    with _inflight_lock:
+        entry = _inflight_downloads.get(key)
+        is_owner = entry is None
+        if is_owner:
+            # The previous owner may have finished between the check above and taking the lock.
+            if os.path.exists(save_path):
+                return f"File already exists: {os.path.basename(save_path)}"
+            entry = {"event": threading.Event(), "status": None}
+            _inflight_downloads[key] = entry
+
+    if not is_owner:
+        print(f"[Download] Waiting for in-progress download of {os.path.basename(save_path)}...")
+        if progress: progress(0, desc=f"{desc} (waiting for another job)")
+        entry["event"].wait()
+        return entry["status"]
+
+    try:
+        entry["status"] = _download_to_path(url, save_path, api_key, progress=progress, desc=desc)
+    finally:
+        with _inflight_lock:
+            _inflight_downloads.pop(key, None)
+        entry["event"].set()
+    return entry["status"]
+
+def get_managed_candidate_paths(source, id_or_url):
+    """Relative paths a Civitai/URL file may occupy inside LORA_DIR or EMBEDDING_DIR."""
+    if not id_or_url or not id_or_url.strip():
+        return []
+    id_or_url = id_or_url.strip()
+    if source == "Civitai":
+        return [os.path.join("civitai", f"{id_or_url}{ext}") for ext in (".safetensors", ".pt")]
+    if source == "Custom URL":
+        url_hash = hashlib.md5(id_or_url.encode()).hexdigest()
+        file_ext = ".pt" if id_or_url.lower().endswith('.pt') else ".safetensors"
+        return [os.path.join("custom", f"{url_hash}{file_ext}")]
+    return []
+
 def get_lora_path(source, id_or_url, civitai_key, progress=None):
     if not id_or_url or not id_or_url.strip():
         return None, "No ID or URL provided."
@@ -78,6 +464,10 @@ def get_lora_path(source, id_or_url, civitai_key, progress=None):
         
     if source == "Civitai":
         subdir = "civitai"
+        for cached_ext in (".safetensors", ".pt"):
+            cached_relative_path = os.path.join(subdir, f"{id_or_url}{cached_ext}")
+            if os.path.exists(os.path.join(LORA_DIR, cached_relative_path)):
+                return cached_relative_path, "File already exists."
         file_info = get_civitai_file_info(id_or_url)
         if file_info and file_info['name'].lower().endswith('.pt'):
             file_ext = ".pt"
@@ -129,6 +519,10 @@ def get_embedding_path(source, id_or_url, civitai_key, progress=None):
 
     if source == "Civitai":
         subdir = "civitai"
+        for cached_ext in (".safetensors", ".pt"):
+            cached_relative_path = os.path.join(subdir, f"{id_or_url}{cached_ext}")
+            if os.path.exists(os.path.join(EMBEDDING_DIR, cached_relative_path)):
+                return cached_relative_path, "File already exists."
         file_info = get_civitai_file_info(id_or_url)
         if file_info and file_info['name'].lower().endswith('.pt'):
             file_ext = ".pt"
@@ -0,0 +1,61 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Iterable
+
+_walk_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fs_walk")
+
+def _matches(name, extensions, names):
+    if not extensions and not names:
+        return True
+    if names and name in names:
+        return True
+    return bool(extensions) and name.lower().endswith(extensions)
+
+def _scan(directory, extensions, names, results, subdirs, directories=None):
+    if directories is not None:
+        directories.append(directory)
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return
+
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            continue
+        if is_dir:
+            if not entry.is_symlink():
+                subdirs.append(entry.path)
+        elif _matches(entry.name, extensions, names):
+            results.append(entry)
+
+def _scan_tree(directory, extensions, names, directories=None):
+    results, subdirs = [], []
+    _scan(directory, extensions, names, results, subdirs, directories)
+    for subdir in subdirs:
+        results.extend(_scan_tree(subdir, extensions, names, directories))
+    return results
+
+def walk_files(root: str, extensions: Iterable[str] = None, names: Iterable[str] = None, parallel: bool = False, directories: list = None) -> List[os.DirEntry]:
+    """
+    Recursively collects files under root in os.walk's top-down order, without following directory symlinks.
+    A file is kept if its lowercased name ends with one of extensions or it exactly matches one of names;
+    with neither given, every file is kept.
+    The returned DirEntry objects cache their stat() results, so callers should use entry.stat()
+    instead of os.path.getmtime/getsize. With parallel=True the top-level subdirectories are scanned
+    concurrently, which mostly helps on network filesystems. If a directories list is given, every
+    scanned directory path is appended to it.
+    """
+    extensions = tuple(ext.lower() for ext in extensions) if extensions else ()
+    names = frozenset(names) if names else frozenset()
+
+    if not parallel:
+        return _scan_tree(root, extensions, names, directories)
+
+    results, subdirs = [], []
+    _scan(root, extensions, names, results, subdirs, directories)
+    for subdir_results in _walk_executor.map(lambda d: _scan_tree(d, extensions, names, directories), subdirs):
+        results.extend(subdir_results)
+    return results
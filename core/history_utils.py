@@ -1,69 +1,154 @@
 import os
 import re
-from collections import defaultdict
+import time
+import sqlite3
+import threading
 from typing import List, Dict, Any
-from core.config import COMFYUI_OUTPUT_PATH
+from core.config import COMFYUI_OUTPUT_PATH, CACHE_PATH
+from core.fs_utils import walk_files
 
-def scan_output_directory(limit: int = 200) -> List[Dict[str, Any]]:
+INDEX_PATH = os.path.join(CACHE_PATH, "history_index.sqlite3")
+REFRESH_INTERVAL = 2.0
+MTIME_GRANULARITY = 2.0
+
+PREFIX_REGEX = re.compile(r"^(.*?)_(\d+)(_\.|\.)")
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.bmp', '.gif'}
+VIDEO_EXTENSIONS = {'.mp4', '.webm'}
+MODEL_3D_EXTENSIONS = {'.glb', '.obj'}
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.flac'}
+
+_conn = None
+_lock = threading.Lock()
+_last_refresh = 0.0
+
+def _get_connection():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(INDEX_PATH, check_same_thread=False)
+        _conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, mtime REAL);
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, dir TEXT, group_key TEXT, mtime REAL);
+            CREATE TABLE IF NOT EXISTS groups (group_key TEXT PRIMARY KEY, latest REAL);
+            CREATE INDEX IF NOT EXISTS idx_dirs_parent ON dirs(parent);
+            CREATE INDEX IF NOT EXISTS idx_files_dir ON files(dir);
+            CREATE INDEX IF NOT EXISTS idx_files_group ON files(group_key);
+            CREATE INDEX IF NOT EXISTS idx_groups_latest ON groups(latest DESC);
+        """)
+    return _conn
+
+def _get_group_key(root, filename):
+    match = PREFIX_REGEX.match(filename)
+    if match:
+        return os.path.join(root, match.group(1))
+    return os.path.join(root, os.path.splitext(filename)[0])
+
+def _rescan_directory(conn, directory, entries, changed_groups):
+    indexed = {path: (group_key, mtime) for path, group_key, mtime in conn.execute(
+        "SELECT path, group_key, mtime FROM files WHERE dir = ?", (directory,)
+    )}
+    current = {entry.path: entry for entry in entries}
+
+    removed = indexed.keys() - current.keys()
+    if removed:
+        conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+        changed_groups.update(indexed[path][0] for path in removed)
+
+    updated = []
+    for path, entry in current.items():
+        try:
+            mod_time = entry.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        known = indexed.get(path)
+        if known and known[1] == mod_time:
+            continue
+        group_key = known[0] if known else _get_group_key(directory, entry.name)
+        updated.append((path, directory, group_key, mod_time))
+        changed_groups.add(group_key)
+    if updated:
+        conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", updated)
+
+def _refresh_index(conn):
+    # A directory modified within MTIME_GRANULARITY of the scan can change again without its mtime
+    # moving, so its mtime is stored as NULL and it is rescanned on the next refresh.
+    scan_started = time.time()
+    changed_groups = set()
+    directories = []
+    files_by_dir = {}
+    root = os.path.normpath(COMFYUI_OUTPUT_PATH)
+    for entry in walk_files(root, directories=directories):
+        files_by_dir.setdefault(os.path.dirname(entry.path), []).append(entry)
+
+    indexed_mtimes = dict(conn.execute("SELECT path, mtime FROM dirs"))
+    for directory in directories:
+        try:
+            dir_mtime = os.stat(directory).st_mtime
+        except FileNotFoundError:
+            continue
+        if indexed_mtimes.get(directory) == dir_mtime:
+            continue
+
+        _rescan_directory(conn, directory, files_by_dir.get(directory, []), changed_groups)
+        stored_mtime = dir_mtime if dir_mtime < scan_started - MTIME_GRANULARITY else None
+        parent = os.path.dirname(directory) if directory != root else None
+        conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)", (directory, parent, stored_mtime))
+
+    seen_dirs = set(directories)
+    stale_dirs = [path for path in indexed_mtimes if path not in seen_dirs]
+    for directory in stale_dirs:
+        changed_groups.update(group for (group,) in conn.execute("SELECT group_key FROM files WHERE dir = ?", (directory,)))
+        conn.execute("DELETE FROM files WHERE dir = ?", (directory,))
+        conn.execute("DELETE FROM dirs WHERE path = ?", (directory,))
+
+    for group_key in changed_groups:
+        (latest,) = conn.execute("SELECT MAX(mtime) FROM files WHERE group_key = ?", (group_key,)).fetchone()
+        if latest is None:
+            conn.execute("DELETE FROM groups WHERE group_key = ?", (group_key,))
+        else:
+            conn.execute("INSERT OR REPLACE INTO groups VALUES (?, ?)", (group_key, latest))
+    conn.commit()
+
+def _pick_preview_file(files):
+    preview_file = None
+    preview_priority = 99
+
+    for f in files:
+        ext = os.path.splitext(f)[1].lower()
+        current_priority = 99
+        if ext in IMAGE_EXTENSIONS: current_priority = 1
+        elif ext in VIDEO_EXTENSIONS: current_priority = 2
+        elif ext in MODEL_3D_EXTENSIONS: current_priority = 3
+        elif ext in AUDIO_EXTENSIONS: current_priority = 4
+
+        if current_priority < preview_priority:
+            preview_priority = current_priority
+            preview_file = f
+    return preview_file
+
+def scan_output_directory(limit: int = 200, offset: int = 0) -> List[Dict[str, Any]]:
+    global _last_refresh
     if not os.path.isdir(COMFYUI_OUTPUT_PATH):
         print(f"[History] Output directory not found: {COMFYUI_OUTPUT_PATH}")
         return []
 
-    prefix_regex = re.compile(r"^(.*?)_(\d+)(_\.|\.)")
-    image_extensions = {'.png', '.jpg', '.jpeg', '.webp', '.bmp', '.gif'}
-    video_extensions = {'.mp4', '.webm'}
-    model_3d_extensions = {'.glb', '.obj'}
-    audio_extensions = {'.mp3', '.wav', '.flac'}
-    
-    grouped_files = defaultdict(lambda: {'files': [], 'latest_timestamp': 0})
-
-    for root, _, files in os.walk(COMFYUI_OUTPUT_PATH):
-        for filename in files:
-            match = prefix_regex.match(filename)
-            if match:
-                prefix = match.group(1)
-                group_key = os.path.join(root, prefix)
-            else:
-                group_key = os.path.join(root, os.path.splitext(filename)[0])
-            
-            full_path = os.path.join(root, filename)
-            
-            try:
-                mod_time = os.path.getmtime(full_path)
-                
-                group = grouped_files[group_key]
-                group['files'].append(full_path)
-                if mod_time > group['latest_timestamp']:
-                    group['latest_timestamp'] = mod_time
-                    
-            except FileNotFoundError:
-                continue
-
-    history_items = []
-    for group_key, data in grouped_files.items():
-        files = sorted(data['files'])
-        
-        preview_file = None
-        preview_priority = 99
-        
-        for f in files:
-            ext = os.path.splitext(f)[1].lower()
-            current_priority = 99
-            if ext in image_extensions: current_priority = 1
-            elif ext in video_extensions: current_priority = 2
-            elif ext in model_3d_extensions: current_priority = 3
-            elif ext in audio_extensions: current_priority = 4
-
-            if current_priority < preview_priority:
-                preview_priority = current_priority
-                preview_file = f
-
-        history_items.append({
-            "timestamp": data['latest_timestamp'],
-            "files": files,
-            "preview_file": preview_file
-        })
-
-    history_items.sort(key=lambda x: x['timestamp'], reverse=True)
-
-    return history_items[:limit]
\ No newline at end of file
+    with _lock:
+        conn = _get_connection()
+        if time.monotonic() - _last_refresh >= REFRESH_INTERVAL:
+            _refresh_index(conn)
+            _last_refresh = time.monotonic()
+
+        groups = conn.execute(
+            "SELECT group_key, latest FROM groups ORDER BY latest DESC LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall()
+
+        history_items = []
+        for group_key, latest in groups:
+            files = sorted(path for (path,) in conn.execute("SELECT path FROM files WHERE group_key = ?", (group_key,)))
+            history_items.append({
+                "timestamp": latest,
+                "files": files,
+                "preview_file": _pick_preview_file(files)
+            })
+
+    return history_items
@@ -0,0 +1,137 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from core.config import COMFYUI_INPUT_PATH, INPUT_CACHE_MAX_SIZE_MB
+from core import job_manager
+
+CACHE_PREFIXES = ("temp_image_", "temp_audio_", "temp_video_")
+HASH_CHUNK_SIZE = 1024 * 1024
+MIN_EVICTION_AGE_SECONDS = 600
+
+_index = None
+_total_size = 0
+_job_claims = {}
+_lock = threading.RLock()
+
+def image_digest(img) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode())
+    hasher.update(img.tobytes())
+    return hasher.hexdigest()[:32]
+
+def file_digest(file_path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()[:32]
+
+def _ensure_index():
+    global _index, _total_size
+    if _index is not None:
+        return
+
+    entries = []
+    try:
+        with os.scandir(COMFYUI_INPUT_PATH) as it:
+            for entry in it:
+                if entry.name.startswith(CACHE_PREFIXES) and not entry.name.endswith(".tmp") and entry.is_file():
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+    except FileNotFoundError:
+        pass
+
+    entries.sort()
+    _index = OrderedDict((name, size) for _, name, size in entries)
+    _total_size = sum(_index.values())
+    print(f"[InputCache] Indexed {len(_index)} cached input file(s), {_total_size / (1024 * 1024):.1f} MB.")
+
+def claim(filename: str, job_id=None):
+    """Keeps filename out of eviction until job_id (default: the current job) is no longer queued or running."""
+    job_id = job_id or job_manager.get_current_job_id()
+    if job_id:
+        with _lock:
+            _job_claims.setdefault(job_id, set()).add(filename)
+
+def _claimed_filenames():
+    active = set(job_manager.get_active_job_ids())
+    for job_id in list(_job_claims):
+        if job_id not in active:
+            del _job_claims[job_id]
+    return set().union(*_job_claims.values())
+
+def lookup(filename: str):
+    path = os.path.join(COMFYUI_INPUT_PATH, filename)
+    claim(filename)
+    with _lock:
+        _ensure_index()
+        if not os.path.exists(path):
+            _forget(filename)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if filename in _index:
+            _index.move_to_end(filename)
+        return path
+
+def store(filename: str, write_func):
+    path = os.path.join(COMFYUI_INPUT_PATH, filename)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        write_func(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    with _lock:
+        _ensure_index()
+        _forget(filename)
+        size = os.path.getsize(path)
+        _index[filename] = size
+        _add_size(size)
+        _evict_if_needed()
+    return path
+
+def _add_size(delta):
+    global _total_size
+    _total_size += delta
+
+def _forget(filename):
+    size = _index.pop(filename, None)
+    if size is not None:
+        _add_size(-size)
+
+def _evict_if_needed():
+    max_bytes = INPUT_CACHE_MAX_SIZE_MB * 1024 * 1024
+    if max_bytes <= 0:
+        return
+
+    now = time.time()
+    claimed = _claimed_filenames()
+    for filename in list(_index.keys()):
+        if _total_size <= max_bytes:
+            break
+        if filename in claimed:
+            continue
+        path = os.path.join(COMFYUI_INPUT_PATH, filename)
+        try:
+            if now - os.path.getmtime(path) < MIN_EVICTION_AGE_SECONDS:
+                break
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[InputCache] Warning: Could not evict '{filename}': {e}")
+            continue
+        _forget(filename)
@@ -1,10 +1,20 @@
 import gradio as gr
 import os
-from .config import CIVITAI_API_KEY
-from .download_utils import get_lora_path, get_embedding_path
-from .utils import save_temp_image
+from concurrent.futures import Future
+from . import user_model_cache
+from .config import LORA_DIR, EMBEDDING_DIR
+from .model_prefetch import resolve_remote_model_input
+from .utils import save_temp_image, deferred_input_staging
 from .yaml_loader import load_and_merge_yaml
 
+def _record_managed_usage(managed_paths):
+    if not managed_paths:
+        return
+    for path in managed_paths:
+        user_model_cache.touch(path)
+    user_model_cache.evict_if_needed(protected=managed_paths)
+
+
 def process_lora_inputs(all_ui_values: dict, prefix: str):
     """
     Processes LoRA-related UI values from a given prefix.
@@ -12,7 +22,6 @@ def process_lora_inputs(all_ui_values: dict, prefix: str):
     """
     key = lambda name: f"{prefix}_{name}"
     
-    loras = []
     lora_sources = all_ui_values.get(key('loras_sources'), [])
     if not lora_sources:
         return []
@@ -21,6 +30,7 @@ def process_lora_inputs(all_ui_values: dict, prefix: str):
     lora_ids_dd = all_ui_values.get(key('loras_file_dropdowns'), [])
     lora_scales = all_ui_values.get(key('loras_scales'), [])
     
+    entries = []
     for i in range(len(lora_sources)):
         scale = lora_scales[i] if i < len(lora_scales) else 1.0
         if scale is not None and scale != 0:
@@ -39,25 +49,35 @@ def process_lora_inputs(all_ui_values: dict, prefix: str):
                 os_specific_subpath = id_val.replace("/", os.sep)
                 name = os.path.join("file", os_specific_subpath)
             elif src in ["Civitai", "Custom URL"] and id_val:
-                path, status_msg = get_lora_path(src, id_val, CIVITAI_API_KEY)
-                if path is None:
-                    raise gr.Error(f"LoRA '{id_val}' failed to download: {status_msg}")
-                name = path
+                name = resolve_remote_model_input("LoRA", src, id_val)
             
             if name:
-                loras.append({"lora_name": name, "strength_model": scale, "strength_clip": scale})
+                entries.append((name, scale, id_val))
+
+    loras = []
+    managed_paths = []
+    for name, scale, id_val in entries:
+        if isinstance(name, Future):
+            path, status_msg = name.result()
+            if path is None:
+                raise gr.Error(f"LoRA '{id_val}' failed to download: {status_msg}")
+            name = path
+            managed_paths.append(os.path.join(LORA_DIR, path))
+        loras.append({"lora_name": name, "strength_model": scale, "strength_clip": scale})
+
+    _record_managed_usage(managed_paths)
     return loras
 
 
 def process_embedding_inputs(all_ui_values: dict, prefix: str):
     key = lambda name: f"{prefix}_{name}"
-    embeddings = []
     embedding_sources = all_ui_values.get(key('embeddings_sources'), [])
     if not embedding_sources:
         return []
         
     embedding_ids = all_ui_values.get(key('embeddings_ids'), [])
     
+    entries = []
     for i in range(len(embedding_sources)):
         name = None
         src = embedding_sources[i] if i < len(embedding_sources) else None
@@ -66,14 +86,23 @@ def process_embedding_inputs(all_ui_values: dict, prefix: str):
         if src == "File" and id_val:
             name = id_val
         elif src in ["Civitai", "Custom URL"] and id_val:
-            path, status_msg = get_embedding_path(src, id_val, CIVITAI_API_KEY)
+            name = resolve_remote_model_input("Embedding", src, id_val)
+        
+        if name:
+            entries.append((name, id_val))
+
+    embeddings = []
+    managed_paths = []
+    for name, id_val in entries:
+        if isinstance(name, Future):
+            path, status_msg = name.result()
             if path is None:
                 raise gr.Error(f"Embedding '{id_val}' failed to download: {status_msg}")
             name = path
-        
-        if name:
-            embeddings.append(name)
+            managed_paths.append(os.path.join(EMBEDDING_DIR, path))
+        embeddings.append(name)
             
+    _record_managed_usage(managed_paths)
     return embeddings
 
 
@@ -87,20 +116,21 @@ def process_controlnet_inputs(all_ui_values: dict, prefix: str):
     cn_strengths = all_ui_values.get(key('controlnet_strengths'), [])
     cn_filepaths = all_ui_values.get(key('controlnet_filepaths'), [])
 
-    for i in range(len(cn_images)):
-        image_pil = cn_images[i]
-        strength = cn_strengths[i] if i < len(cn_strengths) else 1.0
-        cn_path = cn_filepaths[i] if i < len(cn_filepaths) else "None"
-
-        if image_pil is not None and strength > 0 and cn_path and cn_path != "None":
-            image_filename = save_temp_image(image_pil)
-            controlnets.append({
-                "image": image_filename,
-                "strength": strength,
-                "control_net_name": cn_path,
-                "start_percent": 0.0,
-                "end_percent": 1.0,
-            })
+    with deferred_input_staging():
+        for i in range(len(cn_images)):
+            image_pil = cn_images[i]
+            strength = cn_strengths[i] if i < len(cn_strengths) else 1.0
+            cn_path = cn_filepaths[i] if i < len(cn_filepaths) else "None"
+
+            if image_pil is not None and strength > 0 and cn_path and cn_path != "None":
+                image_filename = save_temp_image(image_pil)
+                controlnets.append({
+                    "image": image_filename,
+                    "strength": strength,
+                    "control_net_name": cn_path,
+                    "start_percent": 0.0,
+                    "end_percent": 1.0,
+                })
     return controlnets
 
 def process_anima_controlnet_lllite_inputs(all_ui_values: dict, prefix: str):
@@ -115,22 +145,23 @@ def process_anima_controlnet_lllite_inputs(all_ui_values: dict, prefix: str):
     cn_end_percents = all_ui_values.get(key('anima_controlnet_lllite_end_percents'), [])
     cn_filepaths = all_ui_values.get(key('anima_controlnet_lllite_filepaths'), [])
 
-    for i in range(len(cn_images)):
-        image_pil = cn_images[i]
-        strength = cn_strengths[i] if i < len(cn_strengths) else 1.0
-        start_percent = cn_start_percents[i] if i < len(cn_start_percents) else 0.0
-        end_percent = cn_end_percents[i] if i < len(cn_end_percents) else 1.0
-        cn_path = cn_filepaths[i] if i < len(cn_filepaths) else "None"
-
-        if image_pil is not None and strength > 0 and cn_path and cn_path != "None":
-            image_filename = save_temp_image(image_pil)
-            controlnets.append({
-                "image": image_filename,
-                "strength": strength,
-                "start_percent": start_percent,
-                "end_percent": end_percent,
-                "control_net_name": cn_path,
-            })
+    with deferred_input_staging():
+        for i in range(len(cn_images)):
+            image_pil = cn_images[i]
+            strength = cn_strengths[i] if i < len(cn_strengths) else 1.0
+            start_percent = cn_start_percents[i] if i < len(cn_start_percents) else 0.0
+            end_percent = cn_end_percents[i] if i < len(cn_end_percents) else 1.0
+            cn_path = cn_filepaths[i] if i < len(cn_filepaths) else "None"
+
+            if image_pil is not None and strength > 0 and cn_path and cn_path != "None":
+                image_filename = save_temp_image(image_pil)
+                controlnets.append({
+                    "image": image_filename,
+                    "strength": strength,
+                    "start_percent": start_percent,
+                    "end_percent": end_percent,
+                    "control_net_name": cn_path,
+                })
     return controlnets
 
 def process_diffsynth_controlnet_inputs(all_ui_values: dict, prefix: str):
@@ -143,18 +174,19 @@ def process_diffsynth_controlnet_inputs(all_ui_values: dict, prefix: str):
     cn_strengths = all_ui_values.get(key('diffsynth_controlnet_strengths'), [])
     cn_filepaths = all_ui_values.get(key('diffsynth_controlnet_filepaths'), [])
 
-    for i in range(len(cn_images)):
-        image_pil = cn_images[i]
-        strength = cn_strengths[i] if i < len(cn_strengths) else 1.0
-        cn_path = cn_filepaths[i] if i < len(cn_filepaths) else "None"
-
-        if image_pil is not None and strength > 0 and cn_path and cn_path != "None":
-            image_filename = save_temp_image(image_pil)
-            controlnets.append({
-                "image": image_filename,
-                "strength": strength,
-                "control_net_name": cn_path,
-            })
+    with deferred_input_staging():
+        for i in range(len(cn_images)):
+            image_pil = cn_images[i]
+            strength = cn_strengths[i] if i < len(cn_strengths) else 1.0
+            cn_path = cn_filepaths[i] if i < len(cn_filepaths) else "None"
+
+            if image_pil is not None and strength > 0 and cn_path and cn_path != "None":
+                image_filename = save_temp_image(image_pil)
+                controlnets.append({
+                    "image": image_filename,
+                    "strength": strength,
+                    "control_net_name": cn_path,
+                })
     return controlnets
 
 
@@ -173,24 +205,25 @@ def process_ipadapter_inputs(all_ui_values: dict, prefix: str, ipadapter_presets
     faceid_presets_sdxl = ipadapter_presets_config.get("IPAdapter_FaceID_presets", {}).get("SDXL", [])
     all_faceid_presets = faceid_presets_sd15 + faceid_presets_sdxl
 
-    for i in range(len(ipa_images)):
-        image_pil = ipa_images[i]
-        preset = final_preset
-        weight = ipa_weights[i] if i < len(ipa_weights) else 1.0
-        lora_strength = ipa_lora_strengths[i] if i < len(ipa_lora_strengths) else 0.6
-
-        if image_pil is not None and weight > 0 and preset:
-            image_filename = save_temp_image(image_pil)
-            loader_type = 'FaceID' if preset in all_faceid_presets else 'Unified'
-            item_data = {
-                "image": image_filename,
-                "preset": preset,
-                "weight": weight,
-                "loader_type": loader_type
-            }
-            if loader_type == 'FaceID':
-                item_data['lora_strength'] = lora_strength
-            ipadapters.append(item_data)
+    with deferred_input_staging():
+        for i in range(len(ipa_images)):
+            image_pil = ipa_images[i]
+            preset = final_preset
+            weight = ipa_weights[i] if i < len(ipa_weights) else 1.0
+            lora_strength = ipa_lora_strengths[i] if i < len(ipa_lora_strengths) else 0.6
+
+            if image_pil is not None and weight > 0 and preset:
+                image_filename = save_temp_image(image_pil)
+                loader_type = 'FaceID' if preset in all_faceid_presets else 'Unified'
+                item_data = {
+                    "image": image_filename,
+                    "preset": preset,
+                    "weight": weight,
+                    "loader_type": loader_type
+                }
+                if loader_type == 'FaceID':
+                    item_data['lora_strength'] = lora_strength
+                ipadapters.append(item_data)
     
     if ipadapters:
         final_weight = all_ui_values.get(key('ipadapter_final_weight'))
@@ -229,21 +262,22 @@ def process_flux1_ipadapter_inputs(all_ui_values: dict, prefix: str):
     ipa_start_percents = all_ui_values.get(key('flux1_ipadapter_start_percents'), [])
     ipa_end_percents = all_ui_values.get(key('flux1_ipadapter_end_percents'), [])
 
-    for i in range(len(ipa_images)):
-        image_pil = ipa_images[i]
-        weight = ipa_weights[i] if i < len(ipa_weights) else 0.6
-        start_percent = ipa_start_percents[i] if i < len(ipa_start_percents) else 0.0
-        end_percent = ipa_end_percents[i] if i < len(ipa_end_percents) else 0.6
-
-        if image_pil is not None and weight > 0:
-            image_filename = save_temp_image(image_pil)
-            item_data = {
-                "image": image_filename,
-                "weight": weight,
-                "start_percent": start_percent,
-                "end_percent": end_percent,
-            }
-            ipadapters.append(item_data)
+    with deferred_input_staging():
+        for i in range(len(ipa_images)):
+            image_pil = ipa_images[i]
+            weight = ipa_weights[i] if i < len(ipa_weights) else 0.6
+            start_percent = ipa_start_percents[i] if i < len(ipa_start_percents) else 0.0
+            end_percent = ipa_end_percents[i] if i < len(ipa_end_percents) else 0.6
+
+            if image_pil is not None and weight > 0:
+                image_filename = save_temp_image(image_pil)
+                item_data = {
+                    "image": image_filename,
+                    "weight": weight,
+                    "start_percent": start_percent,
+                    "end_percent": end_percent,
+                }
+                ipadapters.append(item_data)
     
     return ipadapters
 
@@ -259,21 +293,22 @@ def process_sd3_ipadapter_inputs(all_ui_values: dict, prefix: str):
     ipa_start_percents = all_ui_values.get(key('sd3_ipadapter_start_percents'), [])
     ipa_end_percents = all_ui_values.get(key('sd3_ipadapter_end_percents'), [])
 
-    for i in range(len(ipa_images)):
-        image_pil = ipa_images[i]
-        weight = ipa_weights[i] if i < len(ipa_weights) else 0.5
-        start_percent = ipa_start_percents[i] if i < len(ipa_start_percents) else 0.0
-        end_percent = ipa_end_percents[i] if i < len(ipa_end_percents) else 1.0
-
-        if image_pil is not None and weight > 0:
-            image_filename = save_temp_image(image_pil)
-            item_data = {
-                "image": image_filename,
-                "weight": weight,
-                "start_percent": start_percent,
-                "end_percent": end_percent,
-            }
-            ipadapters.append(item_data)
+    with deferred_input_staging():
+        for i in range(len(ipa_images)):
+            image_pil = ipa_images[i]
+            weight = ipa_weights[i] if i < len(ipa_weights) else 0.5
+            start_percent = ipa_start_percents[i] if i < len(ipa_start_percents) else 0.0
+            end_percent = ipa_end_percents[i] if i < len(ipa_end_percents) else 1.0
+
+            if image_pil is not None and weight > 0:
+                image_filename = save_temp_image(image_pil)
+                item_data = {
+                    "image": image_filename,
+                    "weight": weight,
+                    "start_percent": start_percent,
+                    "end_percent": end_percent,
+                }
+                ipadapters.append(item_data)
     
     return ipadapters
 
@@ -287,16 +322,17 @@ def process_style_inputs(all_ui_values: dict, prefix: str):
         
     style_strengths = all_ui_values.get(key('style_strengths'), [])
     
-    for i in range(len(style_images)):
-        image_pil = style_images[i]
-        strength = style_strengths[i] if i < len(style_strengths) else 1.0
-
-        if image_pil is not None and strength > 0:
-            image_filename = save_temp_image(image_pil)
-            styles.append({
-                "image": image_filename,
-                "strength": strength,
-            })
+    with deferred_input_staging():
+        for i in range(len(style_images)):
+            image_pil = style_images[i]
+            strength = style_strengths[i] if i < len(style_strengths) else 1.0
+
+            if image_pil is not None and strength > 0:
+                image_filename = save_temp_image(image_pil)
+                styles.append({
+                    "image": image_filename,
+                    "strength": strength,
+                })
     return styles
 
 
@@ -333,10 +369,11 @@ def process_reference_latent_inputs(all_ui_values: dict, prefix: str):
     if not ref_images:
         return []
     
-    for image_pil in ref_images:
-        if image_pil is not None:
-            image_filename = save_temp_image(image_pil)
-            references.append(image_filename)
+    with deferred_input_staging():
+        for image_pil in ref_images:
+            if image_pil is not None:
+                image_filename = save_temp_image(image_pil)
+                references.append(image_filename)
             
     return references
 
@@ -347,9 +384,10 @@ def process_hidream_o1_reference_inputs(all_ui_values: dict, prefix: str):
     if not ref_images:
         return []
     
-    for image_pil in ref_images:
-        if image_pil is not None:
-            image_filename = save_temp_image(image_pil)
-            references.append(image_filename)
+    with deferred_input_staging():
+        for image_pil in ref_images:
+            if image_pil is not None:
+                image_filename = save_temp_image(image_pil)
+                references.append(image_filename)
             
     return references
\ No newline at end of file
@@ -0,0 +1,103 @@
+import os
+import uuid
+import mimetypes
+import threading
+from collections import defaultdict
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.backend_manager import backend_manager
+from core.config import COMFYUI_INPUT_PATH, COMFYUI_REMOTE_BACKENDS
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+_sessions = {}
+_uploaded = defaultdict(set)
+_key_locks = defaultdict(threading.Lock)
+_lock = threading.Lock()
+
+def is_remote_backend(backend_name: str) -> bool:
+    return backend_name in COMFYUI_REMOTE_BACKENDS
+
+def _get_session(backend_name: str) -> requests.Session:
+    with _lock:
+        session = _sessions.get(backend_name)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[backend_name] = session
+        return session
+
+def _multipart_stream(boundary, fields, file_field, filename, file_path):
+    for name, value in fields.items():
+        yield (
+            f"--{boundary}\r\n"
+            f"Content-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+            f"{value}\r\n"
+        ).encode()
+
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    yield (
+        f"--{boundary}\r\n"
+        f"Content-Disposition: form-data; name=\"{file_field}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+def _upload_to_backend(backend_name, backend_url, filename, file_path):
+    boundary = uuid.uuid4().hex
+    body = _multipart_stream(boundary, {"type": "input", "overwrite": "true"}, "image", filename, file_path)
+    response = _get_session(backend_name).post(
+        f"{backend_url}/upload/image",
+        data=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        timeout=120
+    )
+    response.raise_for_status()
+    result = response.json()
+    uploaded_name = result.get("name", filename)
+    subfolder = result.get("subfolder")
+    return f"{subfolder}/{uploaded_name}" if subfolder else uploaded_name
+
+def stage_input(filename: str, backend_name: str = None) -> str:
+    """Makes a file from the local input directory available to the target backend."""
+    backend_name = backend_name or backend_manager.active_backend_name
+    if not filename or not is_remote_backend(backend_name):
+        return filename
+
+    backend_url = backend_manager.backends.get(backend_name)
+    if not backend_url:
+        return filename
+
+    with _lock:
+        key_lock = _key_locks[(backend_name, filename)]
+
+    with key_lock:
+        if filename in _uploaded[backend_name]:
+            return filename
+
+        file_path = os.path.join(COMFYUI_INPUT_PATH, filename)
+        try:
+            remote_name = _upload_to_backend(backend_name, backend_url, filename, file_path)
+        except (requests.exceptions.RequestException, OSError, ValueError) as e:
+            raise RuntimeError(f"Failed to upload input '{filename}' to backend '{backend_name}': {e}") from e
+
+        if remote_name != filename:
+            print(f"[InputStaging] Warning: Backend '{backend_name}' stored '{filename}' as '{remote_name}'.")
+            return remote_name
+
+        _uploaded[backend_name].add(filename)
+        print(f"[InputStaging] Uploaded '{filename}' to remote backend '{backend_name}'.")
+        return filename
+
+def forget_backend_uploads(backend_name: str):
+    with _lock:
+        _uploaded.pop(backend_name, None)
@@ -8,6 +8,8 @@ import gradio as gr
 
 _jobs: Dict[str, Dict[str, Any]] = {}
 _jobs_lock = threading.Lock()
+_job_context = threading.local()
+_job_preparers = []
 
 STATUS_QUEUED = "queued"
 STATUS_PROCESSING = "processing"
@@ -68,6 +70,19 @@ def update_job(job_id: str, status: str, progress_message: str = "", result_file
             print(f"[JobManager] Updated job {job_id}: Status={status}, Message='{progress_message or error_message}'")
     
 
+def register_job_preparer(preparer):
+    """Registers a callable(job_id, module) that runs before a job's generation starts."""
+    _job_preparers.append(preparer)
+
+def get_current_job_id() -> Optional[str]:
+    return getattr(_job_context, "job_id", None)
+
+def report_job_progress(job_id: Optional[str], progress_message: str):
+    if job_id:
+        update_job(job_id, STATUS_PROCESSING, progress_message)
+    else:
+        print(progress_message)
+
 def run_job_in_background(job_id: str):
     job_info = get_job(job_id)
     if not job_info:
@@ -78,7 +93,11 @@ def run_job_in_background(job_id: str):
     ui_values = job_info["ui_values"]
 
     def worker():
+        _job_context.job_id = job_id
         try:
+            for preparer in _job_preparers:
+                preparer(job_id, module)
+
             update_job(job_id, STATUS_PROCESSING, "Status: Starting generation...")
             
             final_files = []
@@ -115,11 +134,21 @@ def run_job_in_background(job_id: str):
             traceback.print_exc()
             error_msg = f"Error: A critical error occurred: {e}"
             update_job(job_id, STATUS_FAILED, error_message=error_msg)
+        finally:
+            _job_context.job_id = None
 
     thread = threading.Thread(target=worker)
     thread.daemon = True
     thread.start()
 
+def get_active_job_ids() -> List[str]:
+    with _jobs_lock:
+        return [job_id for job_id, job in _jobs.items() if job["status"] in [STATUS_QUEUED, STATUS_PROCESSING]]
+
+def get_active_job_ui_values() -> List[Dict[str, Any]]:
+    with _jobs_lock:
+        return [job["ui_values"] for job in _jobs.values() if job["status"] in [STATUS_QUEUED, STATUS_PROCESSING]]
+
 def get_completed_jobs(limit: int = 100) -> List[Dict[str, Any]]:
     with _jobs_lock:
         completed = [job.copy() for job in _jobs.values() if job["status"] == STATUS_COMPLETED and job.get("result_files")]
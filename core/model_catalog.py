@@ -0,0 +1,61 @@
+import os
+import time
+import threading
+from typing import List
+from core.fs_utils import walk_files
+
+LORA_EXTENSIONS = ('.safetensors', '.pt', '.bin', '.ckpt')
+EMBEDDING_EXTENSIONS = ('.safetensors', '.pt')
+REVALIDATE_INTERVAL = 5.0
+
+_catalog = {}
+_lock = threading.Lock()
+
+def _dir_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _build_entry(root, extensions):
+    directories = []
+    entries = walk_files(root, extensions=extensions, parallel=True, directories=directories)
+    files = sorted(os.path.relpath(entry.path, root).replace("\\", "/") for entry in entries)
+    return {
+        "files": files,
+        "dir_mtimes": {directory: _dir_mtime(directory) for directory in directories},
+        "checked_at": time.monotonic()
+    }
+
+def _is_stale(entry):
+    return any(_dir_mtime(directory) != mtime for directory, mtime in entry["dir_mtimes"].items())
+
+def list_files(root: str, extensions=LORA_EXTENSIONS, force_refresh: bool = False) -> List[str]:
+    """
+    Returns the sorted, '/'-separated paths of model files under root, relative to root.
+    The listing is shared by every caller in the process and only rebuilt when a directory
+    in the tree changes, invalidate() is called, or force_refresh is set.
+    """
+    key = (os.path.abspath(root), tuple(extensions))
+    with _lock:
+        entry = _catalog.get(key)
+        if entry and not force_refresh:
+            if time.monotonic() - entry["checked_at"] < REVALIDATE_INTERVAL:
+                return entry["files"]
+            if not _is_stale(entry):
+                entry["checked_at"] = time.monotonic()
+                return entry["files"]
+
+        entry = _build_entry(key[0], extensions)
+        _catalog[key] = entry
+        return entry["files"]
+
+def invalidate(path: str = None):
+    """Drops cached listings that contain path (or all listings), e.g. after an upload or download."""
+    with _lock:
+        if path is None:
+            _catalog.clear()
+            return
+        path = os.path.abspath(path)
+        for key in [key for key in _catalog if path == key[0] or path.startswith(key[0] + os.sep) or key[0].startswith(path + os.sep)]:
+            del _catalog[key]
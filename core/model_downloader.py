@@ -1,15 +1,31 @@
 import os
 import yaml
 import shutil
-import subprocess
 import requests
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 from huggingface_hub import hf_hub_download
 from core.config import (
     COMFYUI_PATH, HF_CACHE_PATH, CIVITAI_API_KEY, HTTP_PROXY, HTTPS_PROXY,
-    HUGGINGFACE_TOKEN
+    HUGGINGFACE_TOKEN, MODEL_DOWNLOAD_WORKERS, MODEL_DOWNLOAD_CONNECTIONS_PER_HOST, DOWNLOAD_CONNECTIONS, VERIFY_MODEL_CHECKSUMS
 )
 from core.yaml_loader import load_and_merge_yaml
+from core.fs_utils import walk_files
+from core.download_utils import fetch_with_resume, fetch_segmented, get_civitai_file_info
+from core import model_integrity
+
+_host_budgets = {}
+_download_executor = None
+_download_futures = {}
+_download_listeners = {}
+_downloads_lock = threading.RLock()
+_file_entries_cache = None
+_corrupt_redownloads = {}
+_host_budgets_lock = threading.Lock()
 
 def _get_proxies():
     proxies = {}
@@ -28,22 +44,18 @@ def _get_civitai_final_url(model_version_id: str):
             if r.status_code in [301, 302, 307] and 'Location' in r.headers:
                 return r.headers['Location']
             else:
-                api_url = f"https://civitai.com/api/v1/model-versions/{model_version_id}"
-                response = requests.get(api_url, timeout=10, proxies=_get_proxies(), headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                if data.get('files'):
-                    return data['files'][0].get('downloadUrl')
-                return None
+                file_info = get_civitai_file_info(model_version_id)
+                return file_info.get('downloadUrl') if file_info else None
     except requests.RequestException as e:
         print(f"  ❌ Error resolving Civitai URL: {e}")
         return None
 
-def _download_with_hf(file_info, destination_path):
+def _download_with_hf(file_info, destination_path, revision=None):
     try:
         cached_path = hf_hub_download(
             repo_id=file_info['repo_id'],
             filename=file_info['repository_file_path'],
+            revision=revision,
             cache_dir=HF_CACHE_PATH,
             token=HUGGINGFACE_TOKEN
         )
@@ -54,61 +66,58 @@ def _download_with_hf(file_info, destination_path):
         tqdm.write(f"  ❌ [HF Download Error] {e}")
         return False
 
-def _download_with_aria2(url, destination_path):
-    command = [
-        "aria2c",
-        '--console-log-level=warn', '--summary-interval=0',
-        '-x', '16', '-s', '16', '-k', '1M',
-        '-d', os.path.dirname(destination_path),
-        '-o', os.path.basename(destination_path),
-        url
-    ]
-    
-    env = os.environ.copy()
-    if HTTP_PROXY: env['http_proxy'] = HTTP_PROXY
-    if HTTPS_PROXY: env['https_proxy'] = HTTPS_PROXY
-
+def _download_segmented(url, destination_path, progress_callback=None, connections=DOWNLOAD_CONNECTIONS):
     try:
-        subprocess.run(command, check=True, capture_output=True, text=True, encoding='utf-8', env=env)
-        tqdm.write(f"  ✔ Successfully downloaded with Aria2.")
+        fetch_segmented(url, destination_path, progress_callback=progress_callback, connections=connections)
+        tqdm.write(f"  ✔ [{os.path.basename(destination_path)}] Successfully downloaded with segmented downloader.")
         return True
-    except FileNotFoundError:
-        tqdm.write("  ❌ [Aria2 Execution Error] 'aria2c' command not found. The 'aria2' wheel might not be installed correctly.")
-        return False
-    except subprocess.CalledProcessError as e:
-        tqdm.write(f"  ❌ [Aria2 Download Error] Stderr: {e.stderr}")
-        return False
     except Exception as e:
-        tqdm.write(f"  ❌ [Aria2 Execution Error] {e}")
+        tqdm.write(f"  ❌ [{os.path.basename(destination_path)}] [Segmented Download Error] {e}")
         return False
 
-def _download_with_requests(url, destination_path):
+def _download_with_requests(url, destination_path, progress_callback=None):
     try:
-        with requests.get(url, stream=True, proxies=_get_proxies(), timeout=20) as r:
-            r.raise_for_status()
-            total_size = int(r.headers.get('content-length', 0))
-            
-            with open(destination_path, 'wb') as f, tqdm(
-                total=total_size, unit='iB', unit_scale=True,
-                desc=f"  Downloading {os.path.basename(destination_path)}",
-                leave=False
-            ) as pbar:
-                for chunk in r.iter_content(chunk_size=8192):
-                    pbar.update(len(chunk))
-                    f.write(chunk)
-
-        if total_size != 0 and os.path.getsize(destination_path) != total_size:
-            raise IOError("Downloaded file size does not match expected size.")
-            
-        tqdm.write(f"  ✔ Successfully downloaded with Requests.")
+        fetch_with_resume(url, destination_path, progress_callback=progress_callback)
+        tqdm.write(f"  ✔ [{os.path.basename(destination_path)}] Successfully downloaded with Requests.")
         return True
     except Exception as e:
-        tqdm.write(f"  ❌ [Requests Download Error] {e}")
-        if os.path.exists(destination_path):
-            os.remove(destination_path)
+        tqdm.write(f"  ❌ [{os.path.basename(destination_path)}] [Requests Download Error] {e}")
+        tqdm.write(f"  -> Partial data kept in '{os.path.basename(destination_path)}.part'; the next run will resume it.")
         return False
 
-def check_and_download_models():
+class _DownloadSummary:
+    """Single summary bar for concurrent downloads: files completed plus aggregate bytes."""
+    def __init__(self, total_files):
+        self.pbar = tqdm(total=total_files, desc="Downloading Models", unit="file")
+        self.received = {}
+        self.active = set()
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        total_mb = sum(self.received.values()) / (1024 * 1024)
+        self.pbar.set_postfix_str(f"{total_mb:.0f} MB received, {len(self.active)} active")
+
+    def tracker(self, filename):
+        with self.lock:
+            self.active.add(filename)
+            self._refresh()
+
+        def on_progress(downloaded, total):
+            with self.lock:
+                self.received[filename] = downloaded
+                self._refresh()
+        return on_progress
+
+    def file_done(self, filename):
+        with self.lock:
+            self.active.discard(filename)
+            self.pbar.update(1)
+            self._refresh()
+
+    def close(self):
+        self.pbar.close()
+
+def _discover_file_entries():
     global_file_config = load_and_merge_yaml("file_list.yaml")
     
     module_dirs = [
@@ -122,18 +131,15 @@ def check_and_download_models():
         if not os.path.exists(module_dir):
             continue
             
-        for root, dirs, files in os.walk(module_dir):
-            for filename in files:
-                if filename == "file_list.yaml":
-                    module_config_path = os.path.join(root, filename)
-                    try:
-                        with open(module_config_path, 'r', encoding='utf-8') as f:
-                            module_config = yaml.safe_load(f)
-                            if module_config and isinstance(module_config, dict):
-                                module_config['module_path'] = root
-                                all_module_configs.append(module_config)
-                    except Exception as e:
-                        print(f"Warning: Could not load module file_list.yaml from {module_config_path}: {e}")
+        for entry in walk_files(module_dir, names=("file_list.yaml",), parallel=True):
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    module_config = yaml.safe_load(f)
+                    if module_config and isinstance(module_config, dict):
+                        module_config['module_path'] = os.path.dirname(entry.path)
+                        all_module_configs.append(module_config)
+            except Exception as e:
+                print(f"Warning: Could not load module file_list.yaml from {entry.path}: {e}")
     
     all_files_to_check = []
     
@@ -155,59 +161,268 @@ def check_and_download_models():
                         file_info['category'] = category
                         file_info['source_module'] = module_config.get('module_path', 'unknown')
                         all_files_to_check.append(file_info)
-    
-    if not all_files_to_check:
-        print("No files listed in any file_list.yaml or custom/yaml/file_list.yaml.")
-        return
+    return all_files_to_check
 
-    pbar = tqdm(all_files_to_check, desc="Checking Models")
-    for file_info in pbar:
-        category, filename, source = file_info['category'], file_info['filename'], file_info['source']
-        module_path = file_info.get('source_module', 'unknown')
-        pbar.set_postfix_str(f"{category}/{filename}")
+def _plan_downloads(all_files_to_check):
+    """Dedupes entries by destination path and returns the ones missing on disk."""
+    planned = {}
+    for file_info in all_files_to_check:
+        destination_path = os.path.join(COMFYUI_PATH, "models", file_info['category'], file_info['filename'])
+        if destination_path in planned:
+            planned[destination_path]['source_modules'].append(file_info['source_module'])
+            continue
+        planned[destination_path] = dict(file_info, source_modules=[file_info['source_module']])
 
-        destination_dir = os.path.join(COMFYUI_PATH, "models", category)
-        destination_path = os.path.join(destination_dir, filename)
-        
+    missing = []
+    for destination_path, file_info in planned.items():
+        destination_dir = os.path.dirname(destination_path)
         try:
             os.makedirs(destination_dir, exist_ok=True)
         except OSError as e:
-            tqdm.write(f"\nError: Could not create directory '{destination_dir}'. Skipping '{filename}'. Error: {e}")
+            tqdm.write(f"\nError: Could not create directory '{destination_dir}'. Skipping '{file_info['filename']}'. Error: {e}")
             continue
+        if os.path.exists(destination_path) and VERIFY_MODEL_CHECKSUMS != "off":
+            if not model_integrity.quick_check(destination_path):
+                if VERIFY_MODEL_CHECKSUMS == "replace":
+                    tqdm.write(f"\nCorrupted or truncated file detected: {file_info['filename']}. Downloading a replacement...")
+                    _schedule_download(destination_path, file_info, replace=True)
+                else:
+                    tqdm.write(f"\nWarning: {file_info['filename']} does not match its expected size. Keeping it.")
+            else:
+                model_integrity.schedule_verification(
+                    destination_path, file_info, on_corrupt=_redownload_callback(destination_path, file_info)
+                )
+        if not os.path.exists(destination_path):
+            missing.append((destination_path, file_info))
+    return missing
 
-        if os.path.exists(destination_path):
-            continue
+def _redownload_callback(destination_path, file_info):
+    if VERIFY_MODEL_CHECKSUMS != "replace":
+        return None
 
-        tqdm.write(f"\nMissing file: {filename}. Starting download...")
-        
-        download_url = None
-        if source == 'hf':
-            download_url = f"https://huggingface.co/{file_info['repo_id']}/resolve/main/{file_info['repository_file_path']}"
-
-        elif source == 'civitai':
-            tqdm.write("  -> Resolving Civitai redirect URL...")
-            download_url = _get_civitai_final_url(file_info.get('model_version_id'))
-        
-        if not download_url:
-            tqdm.write(f"  ❌ Could not get a valid download URL for {filename}. Skipping.")
-            continue
+    def redownload():
+        with _downloads_lock:
+            if _corrupt_redownloads.get(destination_path, 0) >= 1:
+                tqdm.write(f"  ❌ {file_info['filename']} failed verification again after re-download. Not retrying.")
+                return
+            _corrupt_redownloads[destination_path] = _corrupt_redownloads.get(destination_path, 0) + 1
+        _schedule_download(destination_path, file_info, replace=True)
+    return redownload
 
-        download_successful = False
+class _HostConnectionBudget:
+    """Caps the connections open to one host across every concurrent model download."""
+    def __init__(self, limit):
+        self.available = limit
+        self.condition = threading.Condition()
 
+    @contextmanager
+    def reserve(self, wanted):
+        with self.condition:
+            while self.available <= 0:
+                self.condition.wait()
+            granted = min(wanted, self.available)
+            self.available -= granted
+        try:
+            yield granted
+        finally:
+            with self.condition:
+                self.available += granted
+                self.condition.notify_all()
+
+def _host_budget(host):
+    with _host_budgets_lock:
+        if host not in _host_budgets:
+            _host_budgets[host] = _HostConnectionBudget(MODEL_DOWNLOAD_CONNECTIONS_PER_HOST)
+        return _host_budgets[host]
+
+def _download_planned_file(destination_path, file_info, progress_callback=None, revision=None):
+    filename, source = file_info['filename'], file_info['source']
+    tqdm.write(f"\nMissing file: {filename}. Starting download...")
+    
+    download_url = None
+    if source == 'hf':
+        download_url = f"https://huggingface.co/{file_info['repo_id']}/resolve/{revision or 'main'}/{file_info['repository_file_path']}"
+
+    elif source == 'civitai':
+        tqdm.write(f"  -> [{filename}] Resolving Civitai redirect URL...")
+        download_url = _get_civitai_final_url(file_info.get('model_version_id'))
+    
+    if not download_url:
+        tqdm.write(f"  ❌ Could not get a valid download URL for {filename}. Skipping.")
+        return False
+
+    with _host_budget(urllib.parse.urlparse(download_url).netloc).reserve(DOWNLOAD_CONNECTIONS) as connections:
         if source == 'hf' and HUGGINGFACE_TOKEN and HF_CACHE_PATH:
-            tqdm.write("  -> Attempting download with Hugging Face Hub library...")
-            if _download_with_hf(file_info, destination_path):
-                download_successful = True
-
-        if not download_successful and shutil.which("aria2c"):
-            tqdm.write("  -> Attempting download with Aria2 (Fallback)...")
-            if _download_with_aria2(download_url, destination_path):
-                download_successful = True
-
-        if not download_successful:
-            tqdm.write("  -> Attempting download with standard Python Requests (Final Fallback)...")
-            if _download_with_requests(download_url, destination_path):
-                download_successful = True
-        
-        if not download_successful:
-            tqdm.write(f"  ❌ All download methods failed for {filename}.")
\ No newline at end of file
+            tqdm.write(f"  -> [{filename}] Attempting download with Hugging Face Hub library...")
+            if _download_with_hf(file_info, destination_path, revision):
+                return True
+
+        tqdm.write(f"  -> [{filename}] Attempting download with segmented downloader (Fallback)...")
+        if _download_segmented(download_url, destination_path, progress_callback, connections):
+            return True
+
+        tqdm.write(f"  -> [{filename}] Attempting download with standard Python Requests (Final Fallback)...")
+        if _download_with_requests(download_url, destination_path, progress_callback):
+            return True
+    
+    tqdm.write(f"  ❌ All download methods failed for {filename}.")
+    return False
+
+def _get_download_executor():
+    global _download_executor
+    with _downloads_lock:
+        if _download_executor is None:
+            _download_executor = ThreadPoolExecutor(max_workers=MODEL_DOWNLOAD_WORKERS, thread_name_prefix="model_download")
+        return _download_executor
+
+def _run_planned_download(destination_path, file_info, progress_callback, replace=False):
+    """
+    Downloads one planned file, pinned to the HF commit its checksum was read from. With replace, the
+    download goes to a staging path and only replaces the existing file once it verifies.
+    """
+    try:
+        expected = model_integrity.fetch_expected_metadata(file_info)
+        if expected.get('revision') and expected.get('sha256'):
+            expected['pinned'] = True
+        target_path = f"{destination_path}.replacement" if replace else destination_path
+        success = _download_planned_file(target_path, file_info, progress_callback, revision=expected.get('revision'))
+        if success and replace:
+            success = model_integrity.install_replacement(target_path, destination_path, expected)
+        if success and VERIFY_MODEL_CHECKSUMS != "off":
+            model_integrity.record_download(destination_path, expected)
+            model_integrity.schedule_verification(
+                destination_path, file_info, on_corrupt=_redownload_callback(destination_path, file_info)
+            )
+        return success
+    except Exception as e:
+        tqdm.write(f"  ❌ Unexpected error while downloading {file_info['filename']}: {e}")
+        return False
+
+def _schedule_download(destination_path, file_info, progress_callback=None, replace=False):
+    """Returns the single in-flight future for destination_path, starting it if needed."""
+    executor = _get_download_executor()
+    with _downloads_lock:
+        future = _download_futures.get(destination_path)
+        if future is not None and future.done() and future.result() and os.path.exists(destination_path) and not replace:
+            return future
+
+        if progress_callback:
+            _download_listeners.setdefault(destination_path, []).append(progress_callback)
+        if future is None or future.done():
+            def fan_out(downloaded, total):
+                for callback in list(_download_listeners.get(destination_path, [])):
+                    callback(downloaded, total)
+
+            def release_listeners(_):
+                with _downloads_lock:
+                    _download_listeners.pop(destination_path, None)
+
+            future = executor.submit(_run_planned_download, destination_path, file_info, fan_out, replace)
+            future.add_done_callback(release_listeners)
+            _download_futures[destination_path] = future
+    return future
+
+def _get_file_entries():
+    global _file_entries_cache
+    if _file_entries_cache is None:
+        _file_entries_cache = _discover_file_entries()
+    return _file_entries_cache
+
+def _is_within(path, directory):
+    try:
+        return os.path.commonpath([os.path.abspath(path), os.path.abspath(directory)]) == os.path.abspath(directory)
+    except ValueError:
+        return False
+
+def check_and_download_models(global_only=False):
+    all_files_to_check = _get_file_entries()
+    if global_only:
+        all_files_to_check = [info for info in all_files_to_check if info['source_module'] == "global"]
+    
+    if not all_files_to_check:
+        print("No files listed in any file_list.yaml or custom/yaml/file_list.yaml.")
+        return
+
+    missing = _plan_downloads(all_files_to_check)
+    print(f"[ModelDownloader] Checked {len(all_files_to_check)} entries, {len(missing)} file(s) missing.")
+    if not missing:
+        return
+
+    summary = _DownloadSummary(len(missing))
+    failed = []
+    try:
+        future_to_info = {
+            _schedule_download(destination_path, file_info, summary.tracker(file_info['filename'])): file_info
+            for destination_path, file_info in missing
+        }
+        for future in as_completed(future_to_info):
+            file_info = future_to_info[future]
+            if not future.result():
+                failed.append(file_info['filename'])
+            summary.file_done(file_info['filename'])
+    finally:
+        summary.close()
+
+    if failed:
+        print(f"[ModelDownloader] {len(failed)} download(s) failed: {', '.join(sorted(failed))}")
+
+def start_background_model_downloads():
+    """Schedules every missing module model without blocking startup."""
+    def plan_and_schedule():
+        module_entries = [info for info in _get_file_entries() if info['source_module'] != "global"]
+        missing = _plan_downloads(module_entries)
+        print(f"[ModelDownloader] Scheduling {len(missing)} missing module model(s) in the background.")
+        for destination_path, file_info in missing:
+            _schedule_download(destination_path, file_info)
+
+    threading.Thread(target=plan_and_schedule, daemon=True).start()
+
+def ensure_models_for_module(job_id, module):
+    """
+    Job preparer for lazy model mode: blocks the job until every model listed in the
+    module's file_list.yaml exists, reporting download progress to the job status.
+    """
+    module_file = getattr(module, "__file__", None)
+    if not module_file:
+        return
+
+    entries = [
+        info for info in _get_file_entries()
+        if info['source_module'] != "global" and _is_within(module_file, info['source_module'])
+    ]
+    missing = _plan_downloads(entries)
+    if not missing:
+        return
+
+    from core import job_manager
+
+    progress = {file_info['filename']: (0, 0) for _, file_info in missing}
+    progress_lock = threading.Lock()
+    last_report = [0.0]
+
+    def report():
+        with progress_lock:
+            if time.monotonic() - last_report[0] < 1:
+                return
+            last_report[0] = time.monotonic()
+            parts = [
+                f"{name} {int(downloaded * 100 / total)}%" if total else f"{name} {downloaded / (1024 * 1024):.0f} MB"
+                for name, (downloaded, total) in progress.items()
+            ]
+        job_manager.report_job_progress(job_id, f"Status: Downloading required models: {', '.join(parts)}")
+
+    def tracker(filename):
+        def on_progress(downloaded, total):
+            with progress_lock:
+                progress[filename] = (downloaded, total)
+            report()
+        return on_progress
+
+    job_manager.report_job_progress(job_id, f"Status: Downloading {len(missing)} required model(s)...")
+    futures = {
+        _schedule_download(destination_path, file_info, tracker(file_info['filename'])): file_info['filename']
+        for destination_path, file_info in missing
+    }
+    failed = [futures[future] for future in as_completed(futures) if not future.result()]
+    if failed:
+        raise RuntimeError(f"Required model(s) could not be downloaded: {', '.join(sorted(failed))}")
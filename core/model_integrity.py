@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+from core.config import CACHE_PATH, HUGGINGFACE_TOKEN, HTTP_PROXY, HTTPS_PROXY
+from core.download_utils import get_civitai_file_info
+
+MANIFEST_PATH = os.path.join(CACHE_PATH, "model_manifest.json")
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+METADATA_RETRY_SECONDS = 24 * 60 * 60
+
+_manifest = None
+_lock = threading.RLock()
+_hash_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="model_verify")
+_inflight = set()
+
+def _get_proxies():
+    proxies = {}
+    if HTTP_PROXY: proxies['http'] = HTTP_PROXY
+    if HTTPS_PROXY: proxies['https'] = HTTPS_PROXY
+    return proxies or None
+
+def _load_manifest():
+    global _manifest
+    with _lock:
+        if _manifest is None:
+            try:
+                with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+                    _manifest = json.load(f)
+            except FileNotFoundError:
+                _manifest = {}
+            except (OSError, ValueError) as e:
+                print(f"[ModelIntegrity] Warning: Could not read manifest, starting fresh: {e}")
+                _manifest = {}
+        return _manifest
+
+def _save_manifest():
+    with _lock:
+        tmp_path = f"{MANIFEST_PATH}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(_manifest, f, indent=2)
+        os.replace(tmp_path, MANIFEST_PATH)
+
+def _get_record(destination_path):
+    return _load_manifest().setdefault(destination_path, {})
+
+def _describe_source(file_info):
+    if file_info.get('source') == 'hf':
+        return f"hf:{file_info.get('repo_id')}/{file_info.get('repository_file_path')}"
+    if file_info.get('source') == 'civitai':
+        return f"civitai:{file_info.get('model_version_id')}"
+    return str(file_info.get('source'))
+
+def fetch_expected_metadata(file_info, revision=None):
+    """
+    Returns {'sha256', 'size', 'revision', 'pinned'} from file_list.yaml, the HF LFS headers or the Civitai API.
+    'pinned' is True when the checksum belongs to a fixed artifact: a file_list.yaml hash, a Civitai
+    model version, or the HF commit given as revision. HF lookups without a revision resolve 'main'
+    and return its current commit as 'revision', so a download can be pinned to it.
+    """
+    expected = {'sha256': file_info.get('sha256'), 'size': file_info.get('size'), 'revision': revision, 'pinned': False}
+    if expected['sha256']:
+        expected['sha256'] = expected['sha256'].lower()
+        expected['pinned'] = True
+        return expected
+
+    try:
+        if file_info.get('source') == 'hf':
+            url = f"https://huggingface.co/{file_info['repo_id']}/resolve/{revision or 'main'}/{file_info['repository_file_path']}"
+            headers = {'Authorization': f'Bearer {HUGGINGFACE_TOKEN}'} if HUGGINGFACE_TOKEN else {}
+            response = requests.head(url, headers=headers, allow_redirects=False, timeout=15, proxies=_get_proxies())
+            linked_etag = response.headers.get('X-Linked-Etag', '').strip('"')
+            if len(linked_etag) == 64:
+                expected['sha256'] = linked_etag.lower()
+            linked_size = response.headers.get('X-Linked-Size')
+            if linked_size and linked_size.isdigit():
+                expected['size'] = int(linked_size)
+            expected['revision'] = revision or response.headers.get('X-Repo-Commit')
+            expected['pinned'] = bool(revision and expected['sha256'])
+        elif file_info.get('source') == 'civitai':
+            civitai_file = get_civitai_file_info(file_info.get('model_version_id'))
+            sha256 = (civitai_file or {}).get('hashes', {}).get('SHA256')
+            if sha256:
+                expected['sha256'] = sha256.lower()
+                expected['pinned'] = True
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        print(f"[ModelIntegrity] Warning: Could not fetch checksum metadata for {file_info.get('filename')}: {e}")
+    return expected
+
+def record_download(destination_path, expected):
+    """Stores the metadata of the artifact that was just downloaded to destination_path."""
+    with _lock:
+        record = _get_record(destination_path)
+        for key in ('sha256', 'size', 'revision', 'metadata_checked_at'):
+            record.pop(key, None)
+        record.update({key: value for key, value in expected.items() if value is not None})
+        record['metadata_checked_at'] = time.time()
+        _save_manifest()
+
+def quick_check(destination_path) -> bool:
+    """
+    Cheap size check against the manifest; False means the file is known to be truncated or corrupt.
+    Only pinned checksums can say that, since an unpinned one may describe a newer upstream file.
+    """
+    with _lock:
+        record = _load_manifest().get(destination_path)
+        if not record or not record.get('pinned'):
+            return True
+        expected_size = record.get('size')
+        if expected_size and os.path.getsize(destination_path) != expected_size:
+            return False
+        stat = os.stat(destination_path)
+        if record.get('hashed_mtime') == stat.st_mtime and record.get('hashed_size') == stat.st_size:
+            return not record.get('sha256') or record.get('hashed_sha256') == record['sha256']
+        return True
+
+def _sha256_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _verify(destination_path, file_info, on_corrupt):
+    try:
+        with _lock:
+            record = dict(_get_record(destination_path))
+        record['source'] = _describe_source(file_info)
+
+        if not record.get('sha256') and time.time() - record.get('metadata_checked_at', 0) > METADATA_RETRY_SECONDS:
+            expected = fetch_expected_metadata(file_info, revision=record.get('revision'))
+            record.update({key: value for key, value in expected.items() if value is not None})
+            record['metadata_checked_at'] = time.time()
+
+        stat = os.stat(destination_path)
+        if record.get('hashed_mtime') != stat.st_mtime or record.get('hashed_size') != stat.st_size:
+            record.update({
+                'hashed_sha256': _sha256_file(destination_path),
+                'hashed_mtime': stat.st_mtime,
+                'hashed_size': stat.st_size
+            })
+
+        corrupt = (
+            (record.get('size') and record['hashed_size'] != record['size']) or
+            (record.get('sha256') and record['hashed_sha256'] != record['sha256'])
+        )
+        with _lock:
+            _load_manifest()[destination_path] = record
+            _save_manifest()
+
+        if corrupt and record.get('pinned') and on_corrupt:
+            tqdm.write(f"  ❌ [ModelIntegrity] Checksum mismatch for {os.path.basename(destination_path)}. Keeping it until a verified replacement is downloaded.")
+            on_corrupt()
+        elif corrupt:
+            reason = "" if record.get('pinned') else " It may have been updated upstream or replaced locally."
+            tqdm.write(f"  ⚠️ [ModelIntegrity] Checksum mismatch for {os.path.basename(destination_path)}.{reason} Keeping it.")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[ModelIntegrity] Warning: Could not verify {destination_path}: {e}")
+    finally:
+        with _lock:
+            _inflight.discard(destination_path)
+
+def install_replacement(staging_path, destination_path, expected) -> bool:
+    """Moves a freshly downloaded replacement over destination_path only if it matches the expected checksum."""
+    try:
+        if expected.get('size') and os.path.getsize(staging_path) != expected['size']:
+            raise ValueError(f"size {os.path.getsize(staging_path)} != {expected['size']}")
+        if expected.get('sha256') and _sha256_file(staging_path) != expected['sha256']:
+            raise ValueError("sha256 mismatch")
+    except (OSError, ValueError) as e:
+        tqdm.write(f"  ❌ [ModelIntegrity] Replacement for {os.path.basename(destination_path)} failed verification ({e}). Keeping the current file.")
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+        return False
+    os.replace(staging_path, destination_path)
+    tqdm.write(f"  ✔ [ModelIntegrity] Replaced {os.path.basename(destination_path)} with a verified download.")
+    return True
+
+def schedule_verification(destination_path, file_info, on_corrupt=None):
+    """Hashes the file in the background pool unless it was already hashed at its current mtime/size."""
+    with _lock:
+        if destination_path in _inflight:
+            return
+        record = _load_manifest().get(destination_path, {})
+        try:
+            stat = os.stat(destination_path)
+        except FileNotFoundError:
+            return
+        if (record.get('hashed_mtime') == stat.st_mtime and record.get('hashed_size') == stat.st_size
+                and (record.get('sha256') or time.time() - record.get('metadata_checked_at', 0) < METADATA_RETRY_SECONDS)):
+            return
+        _inflight.add(destination_path)
+    _hash_executor.submit(_verify, destination_path, file_info, on_corrupt)
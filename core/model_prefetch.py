@@ -0,0 +1,174 @@
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from core import job_manager
+from core.config import CIVITAI_API_KEY
+from core.download_utils import get_lora_path, get_embedding_path
+
+class _FetchProgress:
+    """Aggregates per-file download progress and reports it to the owning job."""
+    REPORT_INTERVAL = 1.0
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.files = {}
+        self.last_report = 0.0
+        self.lock = threading.Lock()
+
+    def tracker(self, label):
+        with self.lock:
+            self.files.setdefault(label, 0.0)
+
+        def progress(fraction, desc=""):
+            with self.lock:
+                self.files[label] = fraction
+                now = time.time()
+                if fraction < 1 and now - self.last_report < self.REPORT_INTERVAL:
+                    return
+                self.last_report = now
+                done = sum(1 for value in self.files.values() if value >= 1)
+                summary = ", ".join(f"{name} {int(value * 100)}%" for name, value in self.files.items() if value < 1)
+                message = f"Status: Downloading files ({done}/{len(self.files)} done){': ' + summary if summary else ''}"
+            job_manager.report_job_progress(self.job_id, message)
+        return progress
+
+
+class _SharedProgress:
+    """Forwards one download's progress to the tracker of every job waiting on it."""
+
+    def __init__(self):
+        self.trackers = []
+        self.lock = threading.Lock()
+
+    def add(self, tracker):
+        with self.lock:
+            self.trackers.append(tracker)
+
+    def __call__(self, fraction, desc=""):
+        with self.lock:
+            trackers = list(self.trackers)
+        for tracker in trackers:
+            tracker(fraction, desc)
+
+
+_FETCH_RESOLVERS = {"LoRA": get_lora_path, "Embedding": get_embedding_path}
+_fetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="model_fetch")
+_inflight_fetches = {}
+_fetch_progress = {}
+_fetch_users = {}
+_inflight_lock = threading.RLock()
+_prefetch_context = threading.local()
+
+def _fetch_key(kind, src, id_val):
+    return (kind, src, id_val.strip())
+
+def _submit_fetch(kind, src, id_val, reporter):
+    # Jobs that need the same file while it is still downloading share one future, and each of
+    # them gets the download's progress.
+    key = _fetch_key(kind, src, id_val)
+    label = f"{kind} {id_val.strip()[:30]}"
+    with _inflight_lock:
+        future = _inflight_fetches.get(key)
+        if future is None:
+            shared_progress = _SharedProgress()
+            shared_progress.add(reporter.tracker(label))
+            future = _fetch_executor.submit(
+                _FETCH_RESOLVERS[kind], src, id_val, CIVITAI_API_KEY, progress=shared_progress
+            )
+            _inflight_fetches[key] = future
+            _fetch_progress[key] = shared_progress
+            future.add_done_callback(lambda _, key=key: _discard_fetch(key))
+        elif key in _fetch_progress:
+            _fetch_progress[key].add(reporter.tracker(label))
+    return future
+
+def _discard_fetch(key):
+    with _inflight_lock:
+        future = _inflight_fetches.pop(key, None)
+        _fetch_progress.pop(key, None)
+        _fetch_users.pop(future, None)
+
+def _add_fetch_user(future):
+    # Only futures whose every waiter is counted here may be cancelled.
+    if not future.done():
+        _fetch_users[future] = _fetch_users.get(future, 0) + 1
+
+def _collect_remote_fetches(all_ui_values: dict):
+    fetches = []
+    for sources_key, ids_key, scales_key, kind in (
+        ('_loras_sources', '_loras_ids', '_loras_scales', "LoRA"),
+        ('_embeddings_sources', '_embeddings_ids', None, "Embedding"),
+    ):
+        for key_name, sources in all_ui_values.items():
+            if not key_name.endswith(sources_key) or not isinstance(sources, list):
+                continue
+            prefix = key_name[:-len(sources_key)]
+            ids = all_ui_values.get(f"{prefix}{ids_key}", []) or []
+            scales = all_ui_values.get(f"{prefix}{scales_key}", []) or [] if scales_key else []
+            for i, src in enumerate(sources):
+                id_val = ids[i] if i < len(ids) else None
+                scale = scales[i] if i < len(scales) else 1.0
+                if scales_key and (scale is None or scale == 0):
+                    continue
+                if src in ["Civitai", "Custom URL"] and id_val and id_val.strip():
+                    fetches.append((kind, src, id_val))
+    return fetches
+
+def prefetch_remote_model_inputs(all_ui_values: dict) -> dict:
+    """
+    Starts resolving every Civitai/URL LoRA and embedding referenced by a job at once.
+    Returns the job's {key: future} map, which stays valid (including failed results) for the
+    whole job; pass it to use_prefetched_model_inputs() around input processing and to
+    release_prefetched_model_inputs() when the job ends.
+    """
+    reporter = _FetchProgress(job_manager.get_current_job_id())
+    fetches = {}
+    for kind, src, id_val in _collect_remote_fetches(all_ui_values):
+        key = _fetch_key(kind, src, id_val)
+        if key in fetches:
+            continue
+        with _inflight_lock:
+            future = _submit_fetch(kind, src, id_val, reporter)
+            _add_fetch_user(future)
+        fetches[key] = future
+    return fetches
+
+def release_prefetched_model_inputs(fetches: dict):
+    """Cancels the job's fetches that have not started yet and that no other caller is waiting on."""
+    with _inflight_lock:
+        for future in fetches.values():
+            if future not in _fetch_users:
+                continue
+            users = _fetch_users[future] - 1
+            if users > 0:
+                _fetch_users[future] = users
+            else:
+                _fetch_users.pop(future, None)
+                future.cancel()
+
+@contextmanager
+def use_prefetched_model_inputs(fetches: dict):
+    """Makes a job's prefetched futures visible to resolve_remote_model_input() on this thread."""
+    previous = getattr(_prefetch_context, "fetches", None)
+    _prefetch_context.fetches = fetches
+    try:
+        yield
+    finally:
+        _prefetch_context.fetches = previous
+
+def resolve_remote_model_input(kind, src, id_val):
+    """
+    Returns the future for a Civitai/URL model. The job's prefetched future is reused as is, so a
+    failed download is reported once instead of being retried; unknown inputs are fetched now.
+    A future reached this way counts as a user that is never released, so it is never cancelled.
+    """
+    fetches = getattr(_prefetch_context, "fetches", None)
+    if fetches is not None:
+        future = fetches.get(_fetch_key(kind, src, id_val))
+        if future is not None:
+            return future
+    with _inflight_lock:
+        future = _submit_fetch(kind, src, id_val, _FetchProgress(job_manager.get_current_job_id()))
+        _add_fetch_user(future)
+    return future
@@ -1,22 +1,206 @@
+import os
+import json
+import time
+import hashlib
+import threading
 import requests
 from concurrent.futures import ThreadPoolExecutor
 
 from core.backend_manager import backend_manager
-from core.config import WAIT_FOR_ALL_BACKENDS
+from core.config import WAIT_FOR_ALL_BACKENDS, CACHE_PATH
+
+OBJECT_INFO_CACHE_DIR = os.path.join(CACHE_PATH, "object_info")
+REVALIDATE_RETRIES = 18
+REVALIDATE_RETRY_DELAY = 10
 
 _node_info_cache = {}
+_backend_node_info = {}
+_capability_index = {}
+_backend_fingerprints = {}
+_refresh_listeners = []
+_option_index = {}
+_warned_missing_options = set()
+_cache_lock = threading.Lock()
 
 def _fetch_info_from_backend(backend_name, backend_url):
     api_url = f"{backend_url}/object_info"
     try:
         response = requests.get(api_url, timeout=20)
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException:
+        return response.json(), hashlib.sha256(response.content).hexdigest()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+def _cache_file_path(backend_name):
+    safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in backend_name)
+    return os.path.join(OBJECT_INFO_CACHE_DIR, f"{safe_name}.json")
+
+def _load_cached_info(backend_name, backend_url):
+    try:
+        with open(_cache_file_path(backend_name), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"[NodeInfoManager] Warning: Ignoring unreadable object_info cache for '{backend_name}': {e}")
         return None
+    if cached.get("backend_url") != backend_url or not isinstance(cached.get("object_info"), dict):
+        return None
+    return cached["object_info"], cached.get("fingerprint")
+
+def _save_cached_info(backend_name, backend_url, info_dict, fingerprint):
+    os.makedirs(OBJECT_INFO_CACHE_DIR, exist_ok=True)
+    path = _cache_file_path(backend_name)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "backend_url": backend_url,
+                "fingerprint": fingerprint,
+                "saved_at": time.time(),
+                "object_info": info_dict
+            }, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[NodeInfoManager] Warning: Could not persist object_info cache for '{backend_name}': {e}")
+
+def _apply_merged_info():
+    """
+    Rebuilds the merged view and swaps it in as a new dict, so a dict handed out by get_all_node_info()
+    is never mutated while a reader iterates it. Returns the changed and removed node classes.
+    """
+    global _capability_index, _node_info_cache
+    merged_info = {}
+    capability_index = {}
+    for backend_name in backend_manager.backends:
+        backend_info = _backend_node_info.get(backend_name) or {}
+        merged_info.update(backend_info)
+        for class_type in backend_info:
+            capability_index.setdefault(class_type, set()).add(backend_name)
+    _capability_index = capability_index
+
+    changed = [class_type for class_type, info in merged_info.items() if _node_info_cache.get(class_type) != info]
+    removed = [class_type for class_type in _node_info_cache if class_type not in merged_info]
+    for class_type in changed:
+        _option_index[(None, class_type)] = _build_class_options(merged_info[class_type])
+    for class_type in removed:
+        _option_index.pop((None, class_type), None)
+    _node_info_cache = merged_info
+    _warned_missing_options.difference_update(
+        key for key in list(_warned_missing_options) if key[1] in changed or key[1] in removed
+    )
+    return changed, removed
+
+def register_refresh_listener(listener):
+    """listener(backend_name, class_types) is called after a backend's registry changed for those node classes."""
+    _refresh_listeners.append(listener)
+
+def _notify_refresh_listeners(backend_name, class_types):
+    for listener in _refresh_listeners:
+        try:
+            listener(backend_name, class_types)
+        except Exception as e:
+            print(f"[NodeInfoManager] Warning: Refresh listener failed for '{backend_name}': {e}")
+
+def _refresh_backend(backend_name, backend_url, retries=1):
+    """Refetches one backend's /object_info and swaps it in. Returns the changed class types, or None if unreachable."""
+    result = None
+    for attempt in range(retries):
+        result = _fetch_info_from_backend(backend_name, backend_url)
+        if result is not None:
+            break
+        if attempt < retries - 1:
+            time.sleep(REVALIDATE_RETRY_DELAY)
+    if result is None:
+        return None
+
+    info_dict, fingerprint = result
+    with _cache_lock:
+        if _backend_fingerprints.get(backend_name) == fingerprint:
+            return set()
+        previous_info = _backend_node_info.get(backend_name) or {}
+        changed = {
+            class_type for class_type in previous_info.keys() | info_dict.keys()
+            if previous_info.get(class_type) != info_dict.get(class_type)
+        }
+        _backend_node_info[backend_name] = info_dict
+        _backend_fingerprints[backend_name] = fingerprint
+        for class_type in changed:
+            _option_index.pop((backend_name, class_type), None)
+        _apply_merged_info()
+    _save_cached_info(backend_name, backend_url, info_dict, fingerprint)
+    if changed:
+        _notify_refresh_listeners(backend_name, changed)
+    return changed
+
+def _revalidate_backend(backend_name, backend_url):
+    changed = _refresh_backend(backend_name, backend_url, retries=REVALIDATE_RETRIES)
+    if changed is None:
+        print(f"[NodeInfoManager] Warning: Could not revalidate cached node info for '{backend_name}'. Keeping the cached copy.")
+    elif not changed:
+        print(f"[NodeInfoManager] Cached node info for '{backend_name}' is up to date.")
+    else:
+        print(f"[NodeInfoManager] Revalidated '{backend_name}': {len(changed)} node class(es) changed.")
+
+def refresh_node_info(backend_name: str = None, retries: int = 1) -> dict:
+    """
+    Reloads node info from one backend (or all of them) without a restart, e.g. after installing custom nodes.
+    Returns {backend_name: number of changed node classes, or None if the backend was unreachable}.
+    """
+    backends = backend_manager.backends
+    if backend_name:
+        if backend_name not in backends:
+            raise ValueError(f"Unknown backend '{backend_name}'.")
+        backends = {backend_name: backends[backend_name]}
+
+    summary = {}
+    for name, url in backends.items():
+        changed = _refresh_backend(name, url, retries=retries)
+        summary[name] = None if changed is None else len(changed)
+        if changed is None:
+            print(f"[NodeInfoManager] Warning: Could not refresh node info for '{name}'. Keeping the current registry.")
+        else:
+            print(f"[NodeInfoManager] Refreshed node info for '{name}': {len(changed)} node class(es) changed.")
+    return summary
+
+def _start_background_revalidation(backends):
+    for backend_name, backend_url in backends.items():
+        threading.Thread(
+            target=_revalidate_backend, args=(backend_name, backend_url),
+            name=f"object_info_revalidate_{backend_name}", daemon=True
+        ).start()
+
+def _init_from_disk_cache(all_backends):
+    cached_backends = {}
+    for backend_name, backend_url in all_backends.items():
+        cached = _load_cached_info(backend_name, backend_url)
+        if cached is not None:
+            cached_backends[backend_name] = cached
+
+    if not cached_backends or (WAIT_FOR_ALL_BACKENDS and len(cached_backends) < len(all_backends)):
+        return False
+
+    if WAIT_FOR_ALL_BACKENDS:
+        # Strict mode promises that every backend answered at startup, so the cache only stands in
+        # for /object_info, not for the reachability check.
+        with ThreadPoolExecutor(max_workers=len(all_backends)) as executor:
+            probes = dict(zip(all_backends, executor.map(backend_manager._probe_backend, all_backends.values())))
+        unreachable = sorted(name for name, system in probes.items() if system is None)
+        if unreachable:
+            raise ConnectionError(f"Strict mode enabled. Failed to connect to required backend(s): {', '.join(unreachable)}")
+
+    with _cache_lock:
+        for backend_name, (info_dict, fingerprint) in cached_backends.items():
+            _backend_node_info[backend_name] = info_dict
+            _backend_fingerprints[backend_name] = fingerprint
+            print(f"[NodeInfoManager] Loaded {len(info_dict)} cached nodes for '{backend_name}'.")
+        _apply_merged_info()
+
+    print("[NodeInfoManager] Starting from cached node info. Revalidating against the backends in the background...")
+    _start_background_revalidation(all_backends)
+    return True
 
 def fetch_and_cache_object_info():
-    global _node_info_cache
     if _node_info_cache:
         print("[NodeInfoManager] Node info already cached.")
         return
@@ -25,6 +209,9 @@ def fetch_and_cache_object_info():
     if not all_backends:
         raise ConnectionError("No backends configured in BackendManager.")
 
+    if _init_from_disk_cache(all_backends):
+        return
+
     all_results = {}
     
     print("[NodeInfoManager] Starting node info fetch from all backends...")
@@ -65,50 +252,87 @@ def fetch_and_cache_object_info():
             )
             raise ConnectionError(error_message)
 
-    merged_info = {}
-    for backend_name in successful_backends:
-        info_dict = all_results.get(backend_name)
-        if info_dict:
-            merged_info.update(info_dict)
+    with _cache_lock:
+        for backend_name in successful_backends:
+            info_dict, fingerprint = all_results[backend_name]
+            _backend_node_info[backend_name] = info_dict
+            _backend_fingerprints[backend_name] = fingerprint
             print(f"[NodeInfoManager] Merged {len(info_dict)} nodes from '{backend_name}'.")
+        _apply_merged_info()
+
+    for backend_name in successful_backends:
+        info_dict, fingerprint = all_results[backend_name]
+        _save_cached_info(backend_name, all_backends[backend_name], info_dict, fingerprint)
 
-    _node_info_cache = merged_info
     print(f"[NodeInfoManager] Successfully initialized with nodes from {len(successful_backends)} backend(s).")
 
-def get_node_info(class_type: str):
+def get_node_info(class_type: str, backend_name: str = None):
+    """
+    Returns the node definition as reported by backend_name. Without a backend, or when that backend's
+    registry has not been loaded, falls back to the merged view across all backends.
+    """
+    if backend_name is not None:
+        backend_info = _backend_node_info.get(backend_name)
+        if backend_info is not None:
+            return backend_info.get(class_type)
     return _node_info_cache.get(class_type)
 
-def get_all_node_info():
+def get_all_node_info(backend_name: str = None):
+    if backend_name is not None and backend_name in _backend_node_info:
+        return _backend_node_info[backend_name]
     return _node_info_cache
 
-def get_node_input_options(class_type: str, input_name: str) -> list:
-    node_info = get_node_info(class_type)
-    if not node_info:
-        print(f"[NodeInfoManager] Warning: Could not find node info for class_type '{class_type}'")
+def get_backends_for_node(class_type: str) -> set:
+    return set(_capability_index.get(class_type, ()))
+
+def get_missing_node_types(workflow: dict, backend_name: str) -> list:
+    """Class types used by an API-format workflow that backend_name does not provide. Empty if its registry is unknown."""
+    backend_info = _backend_node_info.get(backend_name)
+    if backend_info is None:
         return []
+    class_types = {node.get("class_type") for node in workflow.values() if isinstance(node, dict)}
+    return sorted(class_type for class_type in class_types if class_type and class_type not in backend_info)
 
-    def _extract_options(details):
-        if isinstance(details, list) and len(details) > 0:
-            if isinstance(details[0], list):
-                return details[0]
-            
-            if len(details) > 1 and isinstance(details[1], dict) and "options" in details[1]:
-                options = details[1]["options"]
-                if isinstance(options, list):
-                    return options
-        return None
+def _extract_options(details):
+    if isinstance(details, list) and len(details) > 0:
+        if isinstance(details[0], list):
+            return details[0]
+        
+        if len(details) > 1 and isinstance(details[1], dict) and "options" in details[1]:
+            options = details[1]["options"]
+            if isinstance(options, list):
+                return options
+    return None
+
+def _build_class_options(node_info):
+    """Maps each input of a node to its option list, with required inputs taking precedence over optional ones."""
+    class_options = {}
+    for section in ("required", "optional"):
+        for input_name, details in (node_info.get("input", {}).get(section) or {}).items():
+            if input_name not in class_options:
+                opts = _extract_options(details)
+                if opts is not None:
+                    class_options[input_name] = opts
+    return class_options
+
+def _warn_once(key, message):
+    if key not in _warned_missing_options:
+        _warned_missing_options.add(key)
+        print(message)
 
-    required_inputs = node_info.get("input", {}).get("required", {})
-    if input_name in required_inputs:
-        opts = _extract_options(required_inputs[input_name])
-        if opts is not None:
-            return opts
-            
-    optional_inputs = node_info.get("input", {}).get("optional", {})
-    if input_name in optional_inputs:
-        opts = _extract_options(optional_inputs[input_name])
-        if opts is not None:
-            return opts
-
-    print(f"[NodeInfoManager] Warning: Could not find options for input '{input_name}' in node '{class_type}'")
-    return []
\ No newline at end of file
+def get_node_input_options(class_type: str, input_name: str, backend_name: str = None) -> list:
+    backend_key = backend_name if backend_name in _backend_node_info else None
+    class_options = _option_index.get((backend_key, class_type))
+    if class_options is None:
+        node_info = get_node_info(class_type, backend_key)
+        if not node_info:
+            _warn_once((backend_key, class_type, None), f"[NodeInfoManager] Warning: Could not find node info for class_type '{class_type}'")
+            return []
+        class_options = _build_class_options(node_info)
+        _option_index[(backend_key, class_type)] = class_options
+
+    opts = class_options.get(input_name)
+    if opts is None:
+        _warn_once((backend_key, class_type, input_name), f"[NodeInfoManager] Warning: Could not find options for input '{input_name}' in node '{class_type}'")
+        return []
+    return opts
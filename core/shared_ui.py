@@ -3,6 +3,7 @@ import os
 import shutil
 from .config import LORA_DIR, EMBEDDING_DIR
 from .yaml_loader import load_and_merge_yaml
+from . import model_catalog
 
 def get_ui_constants():
     """Loads constants for shared UI components."""
@@ -20,6 +21,7 @@ def on_lora_upload(file_obj):
     basename = os.path.basename(file_obj.name)
     new_path = os.path.join(lora_upload_dir, basename)
     shutil.copy(file_obj.name, new_path)
+    model_catalog.invalidate(new_path)
     
     relative_path = os.path.join(upload_subdir, basename)
     
@@ -36,6 +38,7 @@ def on_embedding_upload(file_obj):
     basename = os.path.basename(file_obj.name)
     new_path = os.path.join(embedding_upload_dir, basename)
     shutil.copy(file_obj.name, new_path)
+    model_catalog.invalidate(new_path)
     
     relative_path = os.path.join(upload_subdir, basename)
     
@@ -61,7 +64,7 @@ def create_lora_ui(components, prefix, module_lora_dir=None, required_lora_dirs=
     base_source_choices = ["Civitai", "Custom URL", "Upload File"]
     lora_source_choices = base_source_choices + ["File"] if all_lora_dirs else base_source_choices
 
-    def get_loras_from_dirs(subdirs):
+    def get_loras_from_dirs(subdirs, force_refresh=False):
         if not subdirs:
             return []
         
@@ -70,23 +73,14 @@ def create_lora_ui(components, prefix, module_lora_dir=None, required_lora_dirs=
 
         for subdir in subdirs:
             lora_root_dir = os.path.join(base_search_path, subdir)
-            if not os.path.isdir(lora_root_dir):
-                continue
-
-            for root, _, files in os.walk(lora_root_dir):
-                for filename in files:
-                    if filename.lower().endswith(('.safetensors', '.pt', '.bin', '.ckpt')):
-                        full_path = os.path.join(root, filename)
-                        
-                        value_path = os.path.relpath(full_path, base_search_path).replace("\\", "/")
-                        display_path = os.path.relpath(full_path, lora_root_dir).replace("\\", "/")
-                        
-                        display_name = display_path if display_path != filename else filename
-                        
-                        all_files_with_labels.append((display_name, value_path))
+            for display_name in model_catalog.list_files(lora_root_dir, model_catalog.LORA_EXTENSIONS, force_refresh=force_refresh):
+                value_path = os.path.relpath(os.path.join(lora_root_dir, display_name), base_search_path).replace("\\", "/")
+                all_files_with_labels.append((display_name, value_path))
         
         return sorted(all_files_with_labels, key=lambda x: x[0])
 
+    lora_file_choices = get_loras_from_dirs(all_lora_dirs)
+
     with gr.Accordion(accordion_label, open=False) as lora_accordion:
         components[key('lora_accordion')] = lora_accordion
         lora_rows, sources, ids_txt, ids_dd, scales, files = [], [], [], [], [], []
@@ -104,7 +98,7 @@ def create_lora_ui(components, prefix, module_lora_dir=None, required_lora_dirs=
                 sources.append(gr.Dropdown(label=f"LoRA {i+1}", choices=lora_source_choices, value="Civitai", scale=1, interactive=True))
                 with gr.Column(scale=2, min_width=100):
                     ids_txt.append(gr.Textbox(label="ID/URL/File", placeholder="e.g., 133755", interactive=True, visible=True))
-                    ids_dd.append(gr.Dropdown(label="File", choices=get_loras_from_dirs(all_lora_dirs), interactive=True, visible=False))
+                    ids_dd.append(gr.Dropdown(label="File", choices=lora_file_choices, interactive=True, visible=False))
                 scales.append(gr.Slider(label="Weight", minimum=-1.0, maximum=2.0, step=0.05, value=1.0, scale=2, interactive=True))
                 upload_btn = gr.UploadButton("Upload", file_types=[".safetensors", ".pt", ".bin", ".ckpt"], scale=1)
                 files.append(gr.State(None))
@@ -126,8 +120,22 @@ def create_lora_ui(components, prefix, module_lora_dir=None, required_lora_dirs=
         with gr.Row():
             components[key('add_lora_button')] = gr.Button("✚ Add LoRA")
             components[key('delete_lora_button')] = gr.Button("➖ Delete LoRA", visible=False)
+            if all_lora_dirs:
+                components[key('refresh_lora_files_button')] = gr.Button("🔄 Refresh Files")
         components[key('lora_count_state')] = gr.State(1)
 
+        if all_lora_dirs:
+            def refresh_lora_file_choices():
+                choices = get_loras_from_dirs(all_lora_dirs, force_refresh=True)
+                return [gr.update(choices=choices) for _ in ids_dd]
+
+            components[key('refresh_lora_files_button')].click(
+                fn=refresh_lora_file_choices,
+                inputs=[],
+                outputs=ids_dd,
+                show_api=False
+            )
+
 def create_embedding_ui(components, prefix):
     key = lambda name: f"{prefix}_{name}"
     constants = get_ui_constants()
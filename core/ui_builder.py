@@ -2,9 +2,56 @@ import gradio as gr
 import os
 import time
 from core import job_manager
+from core.config import LAZY_UI_TABS
+from core.ui_loader import get_component_access
 
 from core.backend_manager import backend_manager
 
+class _LazyTabContext:
+    """
+    Tracks which modules are built at startup and the activation states of the ones rendered on first selection.
+    Modules whose event handlers use all_components or demo are built eagerly, and so are modules whose source
+    mentions a key those handlers read; the shared keys must all exist once startup is done.
+    """
+    def __init__(self, eager_modules, shared_keys):
+        self.eager_modules = eager_modules
+        self.shared_keys = shared_keys
+        self.activation_states = {}
+
+    def is_eager(self, sub_tab_name):
+        return sub_tab_name in self.eager_modules
+
+    def bind_activation(self, tab_item, nested_infos):
+        state = self.activation_states.get(_default_leaf_name(nested_infos))
+        if state is not None:
+            tab_item.select(fn=lambda: True, inputs=None, outputs=[state], show_api=False)
+
+    def create_lazy_module_ui(self, module, sub_tab_name, all_components):
+        activated = gr.State(False)
+        self.activation_states[sub_tab_name] = activated
+
+        @gr.render(inputs=[activated], triggers=[activated.change])
+        def render_module(is_activated):
+            if not is_activated:
+                return
+            # Deferred modules never use all_components or demo, so they only see their own components.
+            module_component_map, handler_modules = {}, []
+            _create_and_bind_module_ui(module, {}, module_component_map, handler_modules)
+            for handler_module in handler_modules:
+                try:
+                    components = module_component_map[module.__name__]
+                    handler_module.create_event_handlers(components, dict(components), None)
+                except Exception as e:
+                    import traceback
+                    traceback.print_exc()
+                    print(f"  - Error binding events for {module.__name__}: {e}")
+
+def _default_leaf_name(nested_infos):
+    item = nested_infos[0]
+    while "sub_tab" not in item:
+        item = item[next(iter(item))][0]
+    return item["sub_tab"]
+
 def build_gradio_ui(demo: gr.Blocks, ui_tree: dict, ui_modules: dict, layout_config: dict, share_mode: bool):
     all_components = {}
     modules_with_handlers = []
@@ -28,6 +75,28 @@ def build_gradio_ui(demo: gr.Blocks, ui_tree: dict, ui_modules: dict, layout_con
             discovered_tabs.remove(tab)
     final_tab_order.extend(sorted(discovered_tabs))
 
+    lazy_context = None
+    if LAZY_UI_TABS:
+        access = {sub_tab_name: get_component_access(module) for sub_tab_name, module in ui_modules.items()}
+        eager_modules, shared_keys, unknown_access = set(), set(), []
+        for sub_tab_name, module_access in access.items():
+            if module_access["shares_components"]:
+                eager_modules.add(sub_tab_name)
+                if module_access["shared_component_keys"] is None:
+                    unknown_access.append(ui_modules[sub_tab_name].__name__)
+                else:
+                    shared_keys.update(module_access["shared_component_keys"])
+        for sub_tab_name, module_access in access.items():
+            if shared_keys.intersection(module_access["string_constants"]):
+                eager_modules.add(sub_tab_name)
+            elif job_manager.get_latest_running_job_for_module(ui_modules[sub_tab_name].__name__):
+                eager_modules.add(sub_tab_name)
+        if unknown_access:
+            print(f"[UI Builder] Lazy tabs disabled: event handlers of {', '.join(unknown_access)} read all_components with keys that cannot be determined from source.")
+        else:
+            lazy_context = _LazyTabContext(eager_modules, shared_keys)
+
+    default_tab_found = False
     with gr.Tabs():
         for main_tab_name in final_tab_order:
             sub_tab_infos = ui_tree.get(main_tab_name, [])
@@ -57,13 +126,36 @@ def build_gradio_ui(demo: gr.Blocks, ui_tree: dict, ui_modules: dict, layout_con
             if not final_nested_infos:
                 continue
 
-            with gr.TabItem(main_tab_name):
-                build_ui_for_modules(final_nested_infos, ui_modules, all_components, module_component_map, modules_with_handlers)
+            if lazy_context and not default_tab_found:
+                lazy_context.eager_modules.add(_default_leaf_name(final_nested_infos))
+            default_tab_found = True
+
+            with gr.TabItem(main_tab_name) as main_tab:
+                build_ui_for_modules(final_nested_infos, ui_modules, all_components, module_component_map, modules_with_handlers, lazy_context)
+            if lazy_context:
+                lazy_context.bind_activation(main_tab, final_nested_infos)
+
+    if lazy_context:
+        missing_keys = lazy_context.shared_keys - all_components.keys()
+        if missing_keys and lazy_context.activation_states:
+            raise RuntimeError(
+                f"lazy_ui_tabs: event handlers read components that are not built at startup ({', '.join(sorted(missing_keys))}). "
+                "They may belong to a deferred tab; set lazy_ui_tabs to false."
+            )
+        print(f"[UI Builder] Lazy tabs enabled: {len(module_component_map)} module(s) built at startup, {len(lazy_context.activation_states)} deferred until first selection.")
     
     return all_components, module_component_map, modules_with_handlers
 
 
-def build_ui_for_modules(nested_infos, ui_modules, all_components, module_component_map, modules_with_handlers):
+def _build_module_tab_contents(sub_tab_name, ui_modules, all_components, module_component_map, modules_with_handlers, lazy_context):
+    module = ui_modules[sub_tab_name]
+    if lazy_context and not lazy_context.is_eager(sub_tab_name):
+        lazy_context.create_lazy_module_ui(module, sub_tab_name, all_components)
+    else:
+        _create_and_bind_module_ui(module, all_components, module_component_map, modules_with_handlers)
+
+
+def build_ui_for_modules(nested_infos, ui_modules, all_components, module_component_map, modules_with_handlers, lazy_context=None):
     is_simple_module = (len(nested_infos) == 1 and 
                         isinstance(nested_infos[0], dict) and 
                         "sub_tab" in nested_infos[0] and 
@@ -71,19 +163,21 @@ def build_ui_for_modules(nested_infos, ui_modules, all_components, module_compon
 
     if is_simple_module:
         info = nested_infos[0]
-        module = ui_modules[info["sub_tab"]]
-        _create_and_bind_module_ui(module, all_components, module_component_map, modules_with_handlers)
+        _build_module_tab_contents(info["sub_tab"], ui_modules, all_components, module_component_map, modules_with_handlers, lazy_context)
     else:
         with gr.Tabs():
             for item in nested_infos:
                 if "sub_tab" in item:
-                    with gr.TabItem(item["sub_tab"]):
-                        module = ui_modules[item["sub_tab"]]
-                        _create_and_bind_module_ui(module, all_components, module_component_map, modules_with_handlers)
+                    with gr.TabItem(item["sub_tab"]) as tab_item:
+                        _build_module_tab_contents(item["sub_tab"], ui_modules, all_components, module_component_map, modules_with_handlers, lazy_context)
+                    if lazy_context:
+                        lazy_context.bind_activation(tab_item, [item])
                 else:
                     group_name = next(iter(item))
-                    with gr.TabItem(group_name):
-                        build_ui_for_modules(item[group_name], ui_modules, all_components, module_component_map, modules_with_handlers)
+                    with gr.TabItem(group_name) as tab_item:
+                        build_ui_for_modules(item[group_name], ui_modules, all_components, module_component_map, modules_with_handlers, lazy_context)
+                    if lazy_context:
+                        lazy_context.bind_activation(tab_item, item[group_name])
 
 
 def _create_and_bind_module_ui(module, all_components, module_component_map, modules_with_handlers):
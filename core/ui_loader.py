@@ -1,9 +1,24 @@
 import os
+import ast
+import json
+import time
 import importlib
+import threading
 import sys
 import yaml
 from collections import defaultdict
 from core.yaml_loader import load_and_merge_yaml
+from core.fs_utils import walk_files
+from core.config import CACHE_PATH, LAZY_UI_TABS
+
+MODULE_DIRS = ["module", "custom/module"]
+MODULE_MANIFEST_PATH = os.path.join(CACHE_PATH, "module_manifest.json")
+MODULE_MANIFEST_VERSION = 3
+UI_INFO_READ_METHODS = {"get", "keys", "values", "items", "copy"}
+
+_module_manifest = None
+_import_times = {}
+_import_lock = threading.RLock()
 
 def load_ui_list():
     config = load_and_merge_yaml("ui_list.yaml")
@@ -12,6 +27,234 @@ def load_ui_list():
         return []
     return include_list
 
+def import_module_timed(module_name):
+    """Imports a module and records how long the import took for the startup report."""
+    with _import_lock:
+        if module_name in sys.modules:
+            return sys.modules[module_name]
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        _import_times[module_name] = time.perf_counter() - start
+        return module
+
+def print_import_report():
+    deferred = [entry["module_name"] for entry in (_module_manifest or []) if entry["module_name"] not in sys.modules]
+    print("="*50)
+    print(f"Module import report ({len(_import_times)} imported, {len(deferred)} not imported yet):")
+    for module_name, seconds in sorted(_import_times.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {seconds * 1000:8.1f} ms  {module_name}")
+    print(f"  Total: {sum(_import_times.values()):.2f}s")
+    print("="*50)
+
+class _LazyUIModule:
+    """Stands in for a UI module whose UI_INFO was read from source; the real module is imported on first attribute access."""
+    _FORWARDED_DUNDERS = ("__spec__", "__loader__", "__package__", "__path__", "__all__", "__cached__")
+
+    def __init__(self, module_name, ui_info, path):
+        self.__name__ = module_name
+        self.__file__ = path
+        self.UI_INFO = ui_info
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = import_module_timed(self.__name__)
+            print(f"[UILoader] Imported deferred UI module '{self.__name__}' in {_import_times.get(self.__name__, 0):.2f}s.")
+        return self._module
+
+    def __getattr__(self, name):
+        if name.startswith("__") and name.endswith("__") and name not in self._FORWARDED_DUNDERS:
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+def _source_defines_name(tree, name):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id == name and isinstance(node.ctx, ast.Store):
+            return True
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and any((alias.asname or alias.name) in (name, "*") for alias in node.names):
+            return True
+    return False
+
+def _inspect_component_access(tree):
+    """
+    Reports whether create_event_handlers(components, all_components, demo) uses anything beyond the
+    module's own components, which all_components keys it reads (None when they are not all literals),
+    and the short string constants in the module, which include the keys its own components may use.
+    """
+    string_constants = sorted({
+        node.value for node in ast.walk(tree)
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and 0 < len(node.value) <= 64
+    })
+    handlers = [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == "create_event_handlers"]
+    if not handlers:
+        shares = _source_defines_name(tree, "create_event_handlers")
+        return {"shares_components": shares, "shared_component_keys": None if shares else [], "string_constants": string_constants}
+
+    args = handlers[-1].args
+    params = [arg.arg for arg in args.posonlyargs + args.args]
+    if args.vararg or args.kwarg or len(params) < 3:
+        return {"shares_components": True, "shared_component_keys": None, "string_constants": string_constants}
+    all_components_name, demo_name = params[1], params[2]
+
+    parents = {child: node for node in ast.walk(handlers[-1]) for child in ast.iter_child_nodes(node)}
+    shares, keys = False, set()
+    for node in ast.walk(handlers[-1]):
+        if not isinstance(node, ast.Name) or node.id not in (all_components_name, demo_name):
+            continue
+        shares = True
+        if node.id == demo_name or keys is None:
+            continue
+        parent = parents.get(node)
+        grandparent = parents.get(parent)
+        if isinstance(parent, ast.Subscript) and parent.value is node and isinstance(parent.slice, ast.Constant) and isinstance(parent.slice.value, str):
+            keys.add(parent.slice.value)
+        elif (isinstance(parent, ast.Attribute) and parent.attr == "get" and isinstance(grandparent, ast.Call)
+              and grandparent.args and isinstance(grandparent.args[0], ast.Constant) and isinstance(grandparent.args[0].value, str)):
+            keys.add(grandparent.args[0].value)
+        else:
+            keys = None
+    return {
+        "shares_components": shares,
+        "shared_component_keys": sorted(keys) if keys is not None else None,
+        "string_constants": string_constants,
+    }
+
+def _ui_info_changes_after_assignment(tree):
+    """
+    True if UI_INFO is bound more than once, deleted, mutated in place, or escapes into another name or
+    call anywhere in the module, in which case the literal first assigned to it cannot be trusted.
+    """
+    parents = {child: node for node in ast.walk(tree) for child in ast.iter_child_nodes(node)}
+    bindings = 0
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Global, ast.Nonlocal)) and "UI_INFO" in node.names:
+            return True
+        if not isinstance(node, ast.Name) or node.id != "UI_INFO":
+            continue
+        if not isinstance(node.ctx, ast.Load):
+            bindings += 1
+            if isinstance(node.ctx, ast.Del) or bindings > 1:
+                return True
+            continue
+
+        expr, parent = node, parents.get(node)
+        while isinstance(parent, ast.Subscript) and parent.value is expr:
+            if not isinstance(parent.ctx, ast.Load):
+                return True
+            expr, parent = parent, parents.get(parent)
+        if isinstance(parent, ast.Attribute) and parent.value is expr:
+            if parent.attr not in UI_INFO_READ_METHODS or not isinstance(parents.get(parent), ast.Call):
+                return True
+        elif expr is node and not isinstance(parent, (ast.Compare, ast.Expr, ast.JoinedStr, ast.FormattedValue)):
+            return True
+    return False
+
+def _inspect_module_source(path):
+    """Extracts UI_INFO, MCP_FUNCTIONS and event handler scope from a module's source without importing it."""
+    details = {"ui_info_source": None, "ui_info_dynamic": False, "mcp_functions": None, "has_mcp_functions": False}
+    try:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        details.update(ui_info_dynamic=True, has_mcp_functions=True, shares_components=True, shared_component_keys=None, string_constants=[])
+        return details
+    details.update(_inspect_component_access(tree))
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            targets, value = node.targets, node.value
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            targets, value = [node.target], node.value
+        else:
+            continue
+        names = {target.id for target in targets if isinstance(target, ast.Name)}
+
+        if "UI_INFO" in names:
+            try:
+                if isinstance(ast.literal_eval(value), dict):
+                    details["ui_info_source"] = ast.unparse(value)
+                else:
+                    details["ui_info_dynamic"] = True
+            except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                details["ui_info_dynamic"] = True
+        if "MCP_FUNCTIONS" in names:
+            details["has_mcp_functions"] = True
+            if isinstance(value, (ast.List, ast.Tuple)):
+                details["mcp_functions"] = [element.id for element in value.elts if isinstance(element, ast.Name)]
+
+    if details["ui_info_source"] is None and not details["ui_info_dynamic"]:
+        details["ui_info_dynamic"] = _source_defines_name(tree, "UI_INFO")
+    elif details["ui_info_source"] is not None and _ui_info_changes_after_assignment(tree):
+        details.update(ui_info_source=None, ui_info_dynamic=True)
+    if not details["has_mcp_functions"]:
+        details["has_mcp_functions"] = _source_defines_name(tree, "MCP_FUNCTIONS")
+    return details
+
+def get_module_manifest():
+    """
+    Returns every *_ui.py and *_mcp.py module under the module directories, in discovery order, with its
+    absolute source path and the metadata read from its source. Entries are cached in CACHE_PATH and only re-parsed when a file's mtime or size changes.
+    """
+    global _module_manifest
+    if _module_manifest is not None:
+        return _module_manifest
+
+    try:
+        with open(MODULE_MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+
+    manifest, reparsed = [], 0
+    for module_dir in MODULE_DIRS:
+        if not os.path.isdir(module_dir):
+            continue
+        for entry in walk_files(module_dir, extensions=("_ui.py", "_mcp.py")):
+            stat = entry.stat()
+            key = os.path.abspath(entry.path)
+            record = cached.get(key)
+            if (not record or record.get("version") != MODULE_MANIFEST_VERSION
+                    or record.get("mtime_ns") != stat.st_mtime_ns or record.get("size") != stat.st_size):
+                record = {
+                    "version": MODULE_MANIFEST_VERSION,
+                    "module_name": ".".join(os.path.normpath(entry.path[:-3]).split(os.sep)),
+                    "kind": "ui" if entry.name.lower().endswith("_ui.py") else "mcp",
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    **_inspect_module_source(entry.path)
+                }
+                reparsed += 1
+            manifest.append((key, record))
+
+    if reparsed or len(manifest) != len(cached):
+        tmp_path = f"{MODULE_MANIFEST_PATH}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(manifest), f, indent=2)
+            os.replace(tmp_path, MODULE_MANIFEST_PATH)
+        except OSError as e:
+            print(f"[UILoader] Warning: Could not save module manifest: {e}")
+
+    print(f"[UILoader] Module manifest: {len(manifest)} module(s), {reparsed} re-parsed.")
+    _module_manifest = [{**record, "path": key} for key, record in manifest]
+    return _module_manifest
+
+def get_component_access(module):
+    """
+    Returns the source analysis of a UI module's event handlers: "shares_components" (they use
+    all_components or demo), "shared_component_keys" (the all_components keys they read, or None if
+    those cannot be determined) and "string_constants" (short string literals anywhere in the module).
+    """
+    entry = next((entry for entry in get_module_manifest() if entry["module_name"] == module.__name__), None)
+    if entry is not None:
+        return entry
+    path = getattr(module, "__file__", None)
+    try:
+        with open(path, 'rb') as f:
+            return _inspect_component_access(ast.parse(f.read(), filename=path))
+    except (OSError, TypeError, SyntaxError, ValueError):
+        return {"shares_components": True, "shared_component_keys": None, "string_constants": []}
+
 def discover_ui_modules(ui_list=None):
     ui_tree = defaultdict(list)
     ui_modules = {}
@@ -19,42 +262,49 @@ def discover_ui_modules(ui_list=None):
     if 'custom' not in sys.path:
         sys.path.insert(0, 'custom')
 
-    ui_dirs_to_scan = ["module", "custom/module"]
+    manifest_by_name = {entry["module_name"]: entry for entry in get_module_manifest() if entry["kind"] == "ui"}
     
     if not ui_list:
         print("UI include list is empty. Discovering all UI modules...")
-        for ui_dir in ui_dirs_to_scan:
-            if not os.path.isdir(ui_dir):
-                continue
-            for root, _, files in os.walk(ui_dir):
-                for filename in files:
-                    if filename.endswith("_ui.py") and filename != "__init__.py":
-                        module_path_parts = os.path.normpath(os.path.join(root, filename[:-3])).split(os.sep)
-                        module_name = ".".join(module_path_parts)
-                        _load_and_register_module(module_name, ui_tree, ui_modules)
+        module_names = list(manifest_by_name)
     else:
         print(f"Loading specified UI modules from ui_list.yaml: {ui_list}")
-        for module_name in ui_list:
+        module_names = ui_list
+
+    # Without lazy tabs every listed module is imported, as before the manifest, so import-time side effects
+    # still run; with lazy tabs, modules without any UI_INFO are skipped unimported.
+    for module_name in module_names:
+        entry = manifest_by_name.get(module_name)
+        if not LAZY_UI_TABS or not entry:
+            _load_and_register_module(module_name, ui_tree, ui_modules)
+        elif entry["ui_info_source"] is not None:
+            # Re-evaluated from source because the JSON manifest cannot keep tuples.
+            ui_info = ast.literal_eval(entry["ui_info_source"])
+            _register_ui_info(module_name, ui_info, _LazyUIModule(module_name, ui_info, entry["path"]), ui_tree, ui_modules)
+        elif entry["ui_info_dynamic"]:
             _load_and_register_module(module_name, ui_tree, ui_modules)
 
     return ui_tree, ui_modules
 
 
+def _register_ui_info(module_name, info, module, ui_tree, ui_modules):
+    if "main_tab" not in info or "sub_tab" not in info:
+        print(f"Skipping module {module_name}: UI_INFO missing 'main_tab' or 'sub_tab'.")
+        return
+    
+    main_tab_name = info["main_tab"]
+    sub_tab_name = info["sub_tab"]
+    
+    ui_tree[main_tab_name].append(info)
+    ui_modules[sub_tab_name] = module
+    print(f"Successfully {'registered (deferred import)' if isinstance(module, _LazyUIModule) else 'loaded'} UI module: {module_name}")
+
+
 def _load_and_register_module(module_name, ui_tree, ui_modules):
     try:
-        module = importlib.import_module(module_name)
+        module = import_module_timed(module_name)
         if hasattr(module, "UI_INFO"):
-            info = module.UI_INFO
-            if "main_tab" not in info or "sub_tab" not in info:
-                print(f"Skipping module {module_name}: UI_INFO missing 'main_tab' or 'sub_tab'.")
-                return
-            
-            main_tab_name = info["main_tab"]
-            sub_tab_name = info["sub_tab"]
-            
-            ui_tree[main_tab_name].append(info)
-            ui_modules[sub_tab_name] = module
-            print(f"Successfully loaded UI module: {module_name}")
+            _register_ui_info(module_name, module.UI_INFO, module, ui_tree, ui_modules)
     except ModuleNotFoundError:
         print(f"Error: UI module '{module_name}' specified in ui_list.yaml not found.")
     except Exception as e:
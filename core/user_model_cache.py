@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import threading
+from core.config import LORA_DIR, EMBEDDING_DIR, CACHE_PATH, USER_MODEL_CACHE_MAX_SIZE_GB
+from core.download_utils import get_managed_candidate_paths
+from core import job_manager, model_catalog
+
+ACCESS_LOG_PATH = os.path.join(CACHE_PATH, "user_model_access.json")
+MANAGED_SUBDIRS = ("civitai", "custom")
+MODEL_EXTENSIONS = ('.safetensors', '.pt')
+
+_access_times = None
+_lock = threading.RLock()
+
+def _load_access_times():
+    global _access_times
+    if _access_times is None:
+        try:
+            with open(ACCESS_LOG_PATH, 'r', encoding='utf-8') as f:
+                _access_times = json.load(f)
+        except (OSError, ValueError):
+            _access_times = {}
+    return _access_times
+
+def _save_access_times():
+    tmp_path = f"{ACCESS_LOG_PATH}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(_access_times, f)
+        os.replace(tmp_path, ACCESS_LOG_PATH)
+    except OSError as e:
+        print(f"[UserModelCache] Warning: Could not save access log: {e}")
+
+def touch(path: str):
+    """Records that a managed LoRA/embedding file was used by a job."""
+    with _lock:
+        _load_access_times()[os.path.abspath(path)] = time.time()
+        _save_access_times()
+
+def _referenced_paths():
+    referenced = set()
+    for ui_values in job_manager.get_active_job_ui_values():
+        for base_dir, sources_suffix, ids_suffix in (
+            (LORA_DIR, '_loras_sources', '_loras_ids'),
+            (EMBEDDING_DIR, '_embeddings_sources', '_embeddings_ids'),
+        ):
+            for key_name, sources in ui_values.items():
+                if not key_name.endswith(sources_suffix) or not isinstance(sources, list):
+                    continue
+                ids = ui_values.get(key_name[:-len(sources_suffix)] + ids_suffix, []) or []
+                for source, id_val in zip(sources, ids):
+                    for relative_path in get_managed_candidate_paths(source, id_val):
+                        referenced.add(os.path.abspath(os.path.join(base_dir, relative_path)))
+    return referenced
+
+def _managed_files():
+    files = []
+    for base_dir in (LORA_DIR, EMBEDDING_DIR):
+        for subdir in MANAGED_SUBDIRS:
+            directory = os.path.join(base_dir, subdir)
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.lower().endswith(MODEL_EXTENSIONS):
+                        stat = entry.stat()
+                        files.append((os.path.abspath(entry.path), stat.st_size, stat.st_mtime))
+    return files
+
+def evict_if_needed(protected=None):
+    """Deletes least recently used Civitai/URL LoRAs and embeddings until the size budget is met."""
+    max_bytes = int(USER_MODEL_CACHE_MAX_SIZE_GB * 1024 ** 3)
+    if max_bytes <= 0:
+        return
+
+    with _lock:
+        files = _managed_files()
+        total_size = sum(size for _, size, _ in files)
+        if total_size <= max_bytes:
+            return
+
+        access_times = _load_access_times()
+        keep = {os.path.abspath(p) for p in (protected or [])} | _referenced_paths()
+        candidates = sorted(
+            (access_times.get(path, mtime), path, size) for path, size, mtime in files if path not in keep
+        )
+
+        for _, path, size in candidates:
+            if total_size <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"[UserModelCache] Warning: Could not evict '{path}': {e}")
+                continue
+            total_size -= size
+            access_times.pop(path, None)
+            model_catalog.invalidate(path)
+            print(f"[UserModelCache] Evicted least recently used file: {path}")
+
+        _save_access_times()
+        if total_size > max_bytes:
+            print(f"[UserModelCache] Warning: Still over budget ({total_size / 1024 ** 3:.1f} GB); remaining files are in use.")
@@ -4,39 +4,94 @@ import shutil
 import traceback
 from PIL import Image
 import numpy as np
-from core.config import COMFYUI_INPUT_PATH
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from core.config import COMFYUI_INPUT_PATH, TEMP_IMAGE_FORMAT, TEMP_IMAGE_COMPRESS_LEVEL, INPUT_ENCODE_WORKERS
 from core.comfy_api import run_workflow_and_get_output
+from core import input_cache
+from core.input_staging import stage_input
+from core.backend_manager import backend_manager
+from core.model_prefetch import prefetch_remote_model_inputs, use_prefetched_model_inputs, release_prefetched_model_inputs
+
+_TEMP_IMAGE_EXTENSIONS = {"png": ".png", "tiff": ".tif"}
+
+_encode_executor = ThreadPoolExecutor(max_workers=INPUT_ENCODE_WORKERS, thread_name_prefix="input_encode")
+_staging_context = threading.local()
+
+def _encode_temp_image(img, path):
+    if TEMP_IMAGE_FORMAT == "tiff":
+        img.save(path, "TIFF")
+    else:
+        img.save(path, "PNG", compress_level=TEMP_IMAGE_COMPRESS_LEVEL)
+
+def _materialize_temp_image(img, filename, backend_name=None):
+    if input_cache.lookup(filename) is None:
+        input_cache.store(filename, lambda path: _encode_temp_image(img, path))
+    return stage_input(filename, backend_name)
+
+@contextmanager
+def deferred_input_staging():
+    """
+    Defers the encoding and upload of images passed to save_temp_image until the
+    outermost block exits, running them concurrently on the shared encode pool.
+    Filenames are content hashes, so they are returned before the files exist; if a
+    remote backend stores an upload under another name, the block raises instead of
+    leaving the stale name in the workflow.
+    """
+    if getattr(_staging_context, "pending", None) is not None:
+        yield
+        return
+
+    _staging_context.pending = {}
+    try:
+        yield
+        for filename, future in _staging_context.pending.items():
+            staged_name = future.result()
+            if staged_name != filename:
+                raise RuntimeError(f"Backend stored input '{filename}' as '{staged_name}'; deferred staging requires the name to be kept.")
+    finally:
+        _staging_context.pending = None
 
 def save_temp_image(img):
     if not isinstance(img, Image.Image): return None
-    filename = f"temp_image_{random.randint(10000, 99999)}.png"
-    filepath = os.path.join(COMFYUI_INPUT_PATH, filename)
-    img.save(filepath, "PNG")
-    return os.path.basename(filepath)
+    filename = f"temp_image_{input_cache.image_digest(img)}{_TEMP_IMAGE_EXTENSIONS[TEMP_IMAGE_FORMAT]}"
+
+    pending = getattr(_staging_context, "pending", None)
+    if pending is None:
+        return _materialize_temp_image(img, filename)
+
+    if filename not in pending:
+        input_cache.claim(filename)
+        pending[filename] = _encode_executor.submit(
+            _materialize_temp_image, img, filename, backend_manager.active_backend_name
+        )
+    return filename
+
+def _save_temp_media_file(source_path, prefix, default_ext):
+    ext = os.path.splitext(source_path)[1] or default_ext
+    filename = f"{prefix}_{input_cache.file_digest(source_path)}{ext}"
+    if input_cache.lookup(filename) is None:
+        input_cache.store(filename, lambda path: shutil.copyfile(source_path, path))
+    return filename
 
 def save_temp_audio(audio_path):
     if not audio_path or not os.path.exists(audio_path):
         print(f"Warning: Audio path '{audio_path}' is invalid or does not exist. Cannot save temp audio.")
         return None
     
-    ext = os.path.splitext(audio_path)[1] or ".wav"
-    filename = f"temp_audio_{random.randint(10000, 99999)}{ext}"
-    save_path = os.path.join(COMFYUI_INPUT_PATH, filename)
-    shutil.copy(audio_path, save_path)
-    print(f"Saved temporary audio file to: {save_path}")
-    return os.path.basename(filename)
+    filename = _save_temp_media_file(audio_path, "temp_audio", ".wav")
+    print(f"Saved temporary audio file to: {os.path.join(COMFYUI_INPUT_PATH, filename)}")
+    return stage_input(filename)
 
 def save_temp_video(video_path):
     if not video_path or not os.path.exists(video_path):
         print(f"Warning: Video path '{video_path}' is invalid or does not exist. Cannot save temp video.")
         return None
     
-    ext = os.path.splitext(video_path)[1] or ".mp4"
-    filename = f"temp_video_{random.randint(10000, 99999)}{ext}"
-    save_path = os.path.join(COMFYUI_INPUT_PATH, filename)
-    shutil.copy(video_path, save_path)
-    print(f"Saved temporary video file to: {save_path}")
-    return os.path.basename(filename)
+    filename = _save_temp_media_file(video_path, "temp_video", ".mp4")
+    print(f"Saved temporary video file to: {os.path.join(COMFYUI_INPUT_PATH, filename)}")
+    return stage_input(filename)
 
 def create_mask_from_layer(image_editor_output):
     if not image_editor_output or image_editor_output.get('background') is None or not image_editor_output.get('layers'):
@@ -62,10 +117,14 @@ def handle_seed(seed_value: int, max_val: int = 2**32 - 1) -> int:
 def create_simple_run_generation(process_inputs_func, get_ui_updates_func):
     def run_generation(ui_values):
         final_files = []
+        prefetched = {}
         try:
             yield get_ui_updates_func("Status: Preparing...", final_files)
             
-            workflow, extra_data = process_inputs_func(ui_values)
+            prefetched = prefetch_remote_model_inputs(ui_values)
+
+            with deferred_input_staging(), use_prefetched_model_inputs(prefetched):
+                workflow, extra_data = process_inputs_func(ui_values)
             workflow_package = (workflow, extra_data)
             
             for status, output_files in run_workflow_and_get_output(workflow_package):
@@ -78,6 +137,8 @@ def create_simple_run_generation(process_inputs_func, get_ui_updates_func):
             traceback.print_exc()
             yield get_ui_updates_func(f"Error: {e}", final_files)
             return
+        finally:
+            release_prefetched_model_inputs(prefetched)
 
         yield get_ui_updates_func("Status: Loaded successfully!", final_files)
     
@@ -86,6 +147,7 @@ def create_simple_run_generation(process_inputs_func, get_ui_updates_func):
 def create_batched_run_generation(process_inputs_func, get_ui_updates_func):
     def run_generation(ui_values):
         all_output_files = []
+        prefetched = {}
         try:
             batch_count_key = 'batch_count'
             seed_key = 'seed'
@@ -93,13 +155,16 @@ def create_batched_run_generation(process_inputs_func, get_ui_updates_func):
             batch_count = int(ui_values.get(batch_count_key, 1))
             original_seed = int(ui_values.get(seed_key, -1))
 
+            prefetched = prefetch_remote_model_inputs(ui_values)
+
             for i in range(batch_count):
                 current_seed = original_seed + i if original_seed != -1 else None
                 batch_msg = f" (Batch {i + 1}/{batch_count})" if batch_count > 1 else ""
                 
                 yield get_ui_updates_func(f"Status: Preparing{batch_msg}...", all_output_files)
                 
-                workflow, extra_data = process_inputs_func(ui_values, seed_override=current_seed)
+                with deferred_input_staging(), use_prefetched_model_inputs(prefetched):
+                    workflow, extra_data = process_inputs_func(ui_values, seed_override=current_seed)
                 workflow_package = (workflow, extra_data)
                 
                 for status, output_path in run_workflow_and_get_output(workflow_package):
@@ -116,6 +181,8 @@ def create_batched_run_generation(process_inputs_func, get_ui_updates_func):
             traceback.print_exc()
             yield get_ui_updates_func(f"Error: {e}", all_output_files)
             return
+        finally:
+            release_prefetched_model_inputs(prefetched)
 
         yield get_ui_updates_func("Status: Loaded successfully!", all_output_files)
         
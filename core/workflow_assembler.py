@@ -5,18 +5,31 @@ import importlib.util
 from copy import deepcopy
 import re
 import sys
+import threading
 
 from . import node_info_manager
+from .backend_manager import backend_manager
 from .yaml_loader import load_and_merge_yaml
 
 FRONTEND_DIR = os.path.dirname(os.path.dirname(__file__))
 BASE_RECIPE_DIR = os.path.join(FRONTEND_DIR, "module", "image_gen", "workflow_recipes")
 CUSTOM_RECIPE_DIR = os.path.join(FRONTEND_DIR, "custom", "workflow_recipes")
 
+_template_cache = {}
+_template_cache_lock = threading.Lock()
+
+def _invalidate_templates(backend_name, class_types):
+    with _template_cache_lock:
+        for key in [key for key in _template_cache if key[1] in class_types]:
+            _template_cache.pop(key, None)
+
+node_info_manager.register_refresh_listener(_invalidate_templates)
+
 
 class WorkflowAssembler:
-    def __init__(self, recipe_path, dynamic_values=None, base_path=None):
+    def __init__(self, recipe_path, dynamic_values=None, base_path=None, backend_name=None):
         self.base_path = base_path
+        self.backend_name = backend_name or backend_manager.active_backend_name
         self.node_counter = 0
         self.workflow = {}
         self.node_map = {}
@@ -159,8 +172,16 @@ class WorkflowAssembler:
         return str(self.node_counter)
 
     def _get_node_template_from_api(self, class_type):
-        node_info = node_info_manager.get_node_info(class_type)
+        cache_key = (self.backend_name, class_type)
+        template = _template_cache.get(cache_key)
+        if template is not None:
+            return deepcopy(template)
+
+        node_info = node_info_manager.get_node_info(class_type, self.backend_name)
         if not node_info:
+            other_backends = node_info_manager.get_backends_for_node(class_type)
+            if other_backends:
+                raise ValueError(f"Node with class_type '{class_type}' is not installed on backend '{self.backend_name}'. It is only available on: {', '.join(sorted(other_backends))}.")
             raise ValueError(f"Node with class_type '{class_type}' not found in ComfyUI's /object_info. Is the node installed and named correctly?")
 
         template = { "inputs": {}, "class_type": class_type, "_meta": { "title": node_info.get("display_name", class_type) } }
@@ -170,7 +191,9 @@ class WorkflowAssembler:
         for name, details in all_inputs.items():
             config = details[1] if len(details) > 1 and isinstance(details[1], dict) else {}
             template["inputs"][name] = config.get("default", None)
-        return template
+        with _template_cache_lock:
+            _template_cache[cache_key] = template
+        return deepcopy(template)
 
     def assemble(self, ui_values):
         for name, details in self.recipe['nodes'].items():
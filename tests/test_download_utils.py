@@ -0,0 +1,85 @@
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("COMFYUI_PATH", tempfile.mkdtemp(prefix="comfyui_"))
+
+from core import download_utils
+
+PAYLOAD = bytes(range(256)) * 4096
+ETAG = '"payload-v1"'
+
+
+class _DroppingHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with Range support, but drops the first response for each end offset halfway through."""
+    requests_seen = []
+    dropped_ends = set()
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        self.requests_seen.append(range_header)
+        start, end = 0, len(PAYLOAD) - 1
+        if range_header:
+            first, _, last = range_header.split("=")[1].partition("-")
+            start, end = int(first), int(last) if last else end
+
+        body = PAYLOAD[start:end + 1]
+        self.send_response(206 if range_header else 200)
+        if range_header:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+
+        if len(body) > 1 and end not in self.dropped_ends:
+            self.dropped_ends.add(end)
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def dropping_server():
+    _DroppingHandler.requests_seen = []
+    _DroppingHandler.dropped_ends = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _DroppingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/model.safetensors"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_with_resume_resumes_after_connection_drop(dropping_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_utils.time, "sleep", lambda seconds: None)
+    save_path = tmp_path / "model.safetensors"
+
+    download_utils.fetch_with_resume(dropping_server, str(save_path))
+
+    assert save_path.read_bytes() == PAYLOAD
+    assert _DroppingHandler.requests_seen == [None, f"bytes={len(PAYLOAD) // 2}-"]
+    assert not os.path.exists(f"{save_path}.part")
+    assert not os.path.exists(f"{save_path}.part.json")
+
+
+def test_fetch_segmented_retries_dropped_segments(dropping_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_utils.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(download_utils, "SEGMENT_MIN_SIZE", len(PAYLOAD) // 8)
+    save_path = tmp_path / "model.safetensors"
+
+    download_utils.fetch_segmented(dropping_server, str(save_path), connections=4)
+
+    assert save_path.read_bytes() == PAYLOAD
+    assert len(_DroppingHandler.dropped_ends) == 4
+    assert not os.path.exists(f"{save_path}.part")
+    assert not os.path.exists(f"{save_path}.part.json")